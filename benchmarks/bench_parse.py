@@ -0,0 +1,110 @@
+"""Filename parsing throughput: the old single pattern vs the parser chain.
+
+"legacy" is the pre-registry ``extract_info``: one regex, Sightseeingaway names
+only. "chain (fixed order)" tries the registered parsers in registration
+order for every file; "chain" is :class:`screenshot_sorter.parsers.ParserChain`
+as the engine uses it, with the last matching parser moved to the front.
+Each mix is a list of names in the given proportions (plus 5% junk).
+
+    python benchmarks/bench_parse.py --count 200000 --repeat 5
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from screenshot_sorter.parsers import PARSERS, ParserChain  # noqa: E402
+
+_LEGACY_RE = re.compile(
+    r"^(\d{4}-\d{2}-\d{2})_\d{2}-\d{2}-\d{2}\.\d{3}-(.+)-([^-]+)\.(?:png|jpg|jpeg)$",
+    re.IGNORECASE,
+)
+
+ZONES = ("New Gridania", "Limsa Lominsa Lower Decks", "Ul'dah - Steps of Nald", "The Tempest")
+CHARACTERS = ("Char Name", "Alt Name", "Another-Char")
+
+
+def legacy_parse(filename):
+    match = _LEGACY_RE.match(filename)
+    if match:
+        return "-".join(match.group(1).split("-")[::-1]), match.group(2).strip(), match.group(3).strip()
+    return None, None, None
+
+
+def fixed_order_parse(filename):
+    for parser in PARSERS:
+        parsed = parser.parse(filename)
+        if parsed is not None:
+            return parsed
+    return None
+
+
+def make_name(scheme, rng):
+    y, mo, d = 2025, rng.randint(1, 12), rng.randint(1, 28)
+    h, mi, s, ms = rng.randint(0, 23), rng.randint(0, 59), rng.randint(0, 59), rng.randint(0, 999)
+    ext = rng.choice(("png", "jpg"))
+    if scheme == "sightseeingaway":
+        return f"{y}-{mo:02d}-{d:02d}_{h:02d}-{mi:02d}-{s:02d}.{ms:03d}-{rng.choice(ZONES)}-{rng.choice(CHARACTERS)}.{ext}"
+    if scheme == "vanilla":
+        return f"ffxiv_{y}{mo:02d}{d:02d}_{h:02d}{mi:02d}{s:02d}_{ms:03d}.{ext}"
+    if scheme == "reshade":
+        return f"ffxiv_dx11 {y}-{mo:02d}-{d:02d} {h:02d}-{mi:02d}-{s:02d}.{ext}"
+    if scheme == "steam":
+        return f"39210_{y}{mo:02d}{d:02d}{h:02d}{mi:02d}{s:02d}_{rng.randint(1, 9)}.{ext}"
+    return f"IMG_{rng.randint(0, 99999):05d}.{ext}"
+
+
+MIXES = {
+    "sightseeingaway": {"sightseeingaway": 0.95},
+    "vanilla": {"vanilla": 0.95},
+    "steam": {"steam": 0.95},
+    "mixed": {"sightseeingaway": 0.4, "vanilla": 0.3, "reshade": 0.15, "steam": 0.1},
+}
+
+
+def make_names(mix, count, seed):
+    rng = random.Random(seed)
+    schemes = list(mix) + ["junk"]
+    weights = list(mix.values()) + [1 - sum(mix.values())]
+    names = [make_name(rng.choices(schemes, weights)[0], rng) for _ in range(count)]
+    # Folders hold runs of one scheme (one client/plugin at a time), not a shuffle
+    names.sort(key=lambda n: n[:4])
+    return names
+
+
+def best(repeat, func, names):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(names)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    runners = {
+        "legacy": lambda names: [legacy_parse(n) for n in names],
+        "chain (fixed order)": lambda names: [fixed_order_parse(n) for n in names],
+        "chain": lambda names: list(map(ParserChain().parse, names)),
+    }
+    print(f"{'mix':<17}{'parser':<21}{'files/s':>12}{'matched':>9}")
+    for mix_name, mix in MIXES.items():
+        names = make_names(mix, args.count, args.seed)
+        for runner_name, run in runners.items():
+            seconds = best(args.repeat, run, names)
+            matched = sum(1 for r in run(names) if r is not None and r[0] is not None)
+            print(f"{mix_name:<17}{runner_name:<21}{len(names) / seconds:>12,.0f}{matched / len(names):>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Benchmark the sort engine stage by stage on a synthetic corpus.
+
+Stages: ``scan`` (directory walk), ``parse`` (filename parsing), ``transfer``
+(full engine run without watermark) and ``watermark`` (full engine run with
+watermark), the last two for both Option 1 (archive) and Option 2 (copy).
+Engine stages run in a fresh process each, so the reported peak RSS belongs to
+that stage alone (``+children`` includes the watermark worker processes).
+
+    python benchmarks/bench_sorter.py --count 2000 --size 3840x2160 --json out.json
+    python benchmarks/bench_sorter.py --count 2000 --compare out.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import PIL  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from benchmarks.corpus import add_corpus_args, generate  # noqa: E402
+from screenshot_sorter import SortEngine, SortSettings, WatermarkSettings  # noqa: E402
+from screenshot_sorter.parsers import ParserChain  # noqa: E402
+from screenshot_sorter.scan import scan_sources  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STAGES = ("scan", "parse", "transfer-archive", "transfer-copy", "watermark-archive", "watermark-copy")
+
+
+def peak_rss_mb(who="self"):
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN)
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return round(usage.ru_maxrss * scale / 1e6, 1)
+
+
+def _best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_scan(corpus, repeat):
+    seconds, entries = _best_of(repeat, lambda: list(scan_sources([corpus])))
+    return {"seconds": seconds, "files": len(entries)}
+
+
+def bench_parse(corpus, repeat):
+    names = [e.name for e in scan_sources([corpus])]
+    seconds, _ = _best_of(repeat, lambda: list(map(ParserChain().parse, names)))
+    return {"seconds": seconds, "files": len(names)}
+
+
+def _engine_stage(corpus, work, mode, watermark, jobs, transfer, io_jobs):
+    """Runs in its own process: copy the corpus (untimed), then time one engine run."""
+    source = os.path.join(work, "source")
+    dest = os.path.join(work, "dest")
+    shutil.copytree(corpus, source)
+    os.makedirs(dest)
+
+    settings = SortSettings(
+        source=source,
+        mode=mode,
+        dest=dest if mode == "copy" else None,
+        watermark=WatermarkSettings(path=watermark) if watermark else None,
+        jobs=jobs,
+        io_jobs=io_jobs,
+        transfer=transfer,
+    )
+    start = time.perf_counter()
+    summary = SortEngine(settings).run()
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        "files": summary["total"],
+        "peak_rss_mb": peak_rss_mb("self"),
+        "peak_rss_children_mb": peak_rss_mb("children"),
+    }
+
+
+def run_engine_stage(corpus, root, mode, watermark, jobs, transfer, io_jobs):
+    work = tempfile.mkdtemp(dir=root)
+    try:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as ex:
+            return ex.submit(_engine_stage, corpus, work, mode, watermark, jobs, transfer, io_jobs).result()
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def make_watermark(path):
+    Image.new("RGBA", (600, 200), (255, 255, 255, 180)).save(path)
+    return path
+
+
+def run(args):
+    root = tempfile.mkdtemp(prefix="sorter-bench-", dir=args.workdir)
+    try:
+        corpus = os.path.join(root, "corpus")
+        corpus_info = generate(corpus, args.count, args.size, args.png_ratio, args.malformed_ratio, args.seed)
+        watermark = make_watermark(os.path.join(root, "wm.png"))
+
+        stages = {}
+        for stage in args.stages:
+            if stage == "scan":
+                result = bench_scan(corpus, args.repeat)
+                result["peak_rss_mb"] = peak_rss_mb("self")
+            elif stage == "parse":
+                result = bench_parse(corpus, args.repeat)
+                result["peak_rss_mb"] = peak_rss_mb("self")
+            else:
+                kind, mode = stage.split("-")
+                result = run_engine_stage(
+                    corpus, root, mode, watermark if kind == "watermark" else None, args.jobs, args.transfer,
+                    args.io_jobs,
+                )
+            result["files_per_s"] = round(result["files"] / result["seconds"], 1) if result["seconds"] else None
+            result["seconds"] = round(result["seconds"], 4)
+            stages[stage] = result
+            print(_format_row(stage, result), flush=True)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pillow": PIL.__version__,
+            "cpus": os.cpu_count(),
+            "jobs": args.jobs,
+            "io_jobs": args.io_jobs,
+            "transfer": args.transfer,
+            "corpus": corpus_info,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "stages": stages,
+    }
+
+
+def _format_row(stage, r):
+    rss = r.get("peak_rss_mb")
+    rss_txt = f"{rss:8.1f} MB" if rss is not None else "        -"
+    children = r.get("peak_rss_children_mb")
+    if children:
+        rss_txt += f" (+children {children:.1f} MB)"
+    return f"{stage:<18} {r['files']:>7} files {r['seconds']:>9.3f} s {r['files_per_s'] or 0:>10.1f} files/s {rss_txt}"
+
+
+def compare(old, new):
+    print("\nstage               old files/s   new files/s   speedup")
+    for stage, result in new["stages"].items():
+        before = old.get("stages", {}).get(stage)
+        if not before or not before.get("files_per_s") or not result.get("files_per_s"):
+            continue
+        ratio = result["files_per_s"] / before["files_per_s"]
+        print(f"{stage:<18} {before['files_per_s']:>12.1f}  {result['files_per_s']:>12.1f}  {ratio:>7.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_corpus_args(parser)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="watermark worker processes")
+    parser.add_argument("--io-jobs", type=int, default=2, help="writer threads (0 = sequential, as before the pipeline)")
+    parser.add_argument("--transfer", default="auto", help="transfer policy for the engine stages")
+    parser.add_argument("--repeat", type=int, default=5, help="best-of-N for the scan/parse stages")
+    parser.add_argument("--workdir", help="where to build the corpus (default: system temp)")
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="compare against an earlier --json result")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Per-image watermark cost: the old full-frame RGBA path vs the current one.
+
+The "legacy" path is the pre-optimisation ``apply_watermark``: convert the whole
+base to RGBA, paste, convert back to RGB for JPEG. "current" is
+:func:`screenshot_sorter.watermark.render_watermark`. Both get the same cached
+overlay, so the difference is compositing plus the mode conversions.
+
+    python benchmarks/bench_watermark.py --size 3840x2160 --repeat 10
+"""
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image  # noqa: E402
+
+from benchmarks.corpus import _render, parse_size  # noqa: E402
+from screenshot_sorter.watermark import prepared_watermark, render_watermark  # noqa: E402
+
+
+def legacy_render(filepath, wm_path, opacity, out_path):
+    base = Image.open(filepath).convert("RGBA")
+    wm, _ = prepared_watermark(wm_path, base.width, opacity)
+    base.paste(wm, (base.width - wm.width - 10, base.height - wm.height - 10), wm)
+    if out_path.lower().endswith((".jpg", ".jpeg")):
+        base.convert("RGB").save(out_path, quality=95)
+    else:
+        base.save(out_path)
+
+
+def current_render(filepath, wm_path, opacity, out_path):
+    render_watermark(filepath, wm_path, "bottom-right", opacity, out_path)
+
+
+def _composite_only(img, wm_path, opacity, legacy):
+    """Time just the in-memory part (no decode/encode)."""
+    start = time.perf_counter()
+    if legacy:
+        base = img.convert("RGBA")
+        wm, mask = prepared_watermark(wm_path, base.width, opacity)
+        base.paste(wm, (base.width - wm.width - 10, base.height - wm.height - 10), mask)
+        base.convert("RGB")
+    else:
+        base = img.copy()
+        wm, mask = prepared_watermark(wm_path, base.width, opacity, base.mode)
+        base.paste(wm, (base.width - wm.width - 10, base.height - wm.height - 10), mask)
+    return time.perf_counter() - start
+
+
+def best(repeat, func):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=parse_size, default=(3840, 2160))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    work = tempfile.mkdtemp(prefix="wm-bench-")
+    try:
+        wm_path = os.path.join(work, "wm.png")
+        Image.new("RGBA", (600, 200), (255, 255, 255, 180)).save(wm_path)
+        img = _render(*args.size, seed=1)
+
+        print(f"{'format':<7}{'step':<12}{'legacy ms':>11}{'current ms':>12}{'speedup':>9}")
+        for ext in ("jpg", "png"):
+            src = os.path.join(work, f"src.{ext}")
+            buf = io.BytesIO()
+            img.save(buf, "JPEG" if ext == "jpg" else "PNG", **({"quality": 92} if ext == "jpg" else {"compress_level": 1}))
+            with open(src, "wb") as f:
+                f.write(buf.getvalue())
+            out = os.path.join(work, f"out.{ext}")
+
+            decoded = Image.open(src)
+            decoded.load()
+            rows = [
+                ("composite", min(_composite_only(decoded, wm_path, 0.7, True) for _ in range(args.repeat)),
+                 min(_composite_only(decoded, wm_path, 0.7, False) for _ in range(args.repeat))),
+                ("end-to-end", best(args.repeat, lambda: legacy_render(src, wm_path, 0.7, out)),
+                 best(args.repeat, lambda: current_render(src, wm_path, 0.7, out))),
+            ]
+            for step, legacy, current in rows:
+                print(f"{ext:<7}{step:<12}{legacy * 1000:>11.1f}{current * 1000:>12.1f}{legacy / current:>8.2f}x")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
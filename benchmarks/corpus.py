@@ -0,0 +1,126 @@
+"""Synthetic FFXIV screenshot corpus generator for the benchmarks.
+
+Files are named ``YYYY-MM-DD_HH-MM-SS.mmm-Location-Character.ext`` like the
+Sightseeingaway plugin writes them, with a configurable share of malformed
+names. Only a small pool of distinct images is actually encoded; every file
+gets a unique trailer after the image data (ignored by decoders), so contents
+and hashes still differ per file while generation stays fast.
+
+    python benchmarks/corpus.py OUT_DIR --count 5000 --size 3840x2160 --png-ratio 0.5
+"""
+import argparse
+import io
+import os
+import random
+from datetime import datetime, timedelta
+
+from PIL import Image, ImageDraw
+
+LOCATIONS = [
+    "New Gridania", "Old Gridania", "Central Shroud", "South Shroud",
+    "Limsa Lominsa Lower Decks", "Ul'dah - Steps of Nald", "The Gold Saucer",
+    "Idyllshire", "Kugane", "The Crystarium", "Old Sharlayan", "Tuliyollal",
+]
+CHARACTERS = ["Char Name", "Alisaie Leveilleur", "Y'shtola Rhul", "Thancred Waters", "G'raha Tia"]
+MALFORMED = [
+    "IMG_{n:05d}.{ext}",
+    "ffxiv_{n:08d}.{ext}",
+    "Screenshot {n}.{ext}",
+    "2024-13-45-broken-{n}.{ext}",
+]
+
+POOL_SIZE = 8
+
+
+def _render(width, height, seed):
+    """A cheap but non-trivial image: gradient plus random shapes (compresses like a screenshot-ish frame)."""
+    rng = random.Random(seed)
+    img = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    draw = ImageDraw.Draw(img)
+    for _ in range(40):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = x0 + rng.randrange(width // 4 + 1), y0 + rng.randrange(height // 4 + 1)
+        draw.rectangle((x0, y0, x1, y1), fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    return img
+
+
+def _encoded_pool(width, height, fmt, seed):
+    pool = []
+    for i in range(POOL_SIZE):
+        buf = io.BytesIO()
+        img = _render(width, height, seed * 1000 + i)
+        if fmt == "JPEG":
+            img.save(buf, "JPEG", quality=92)
+        else:
+            img.save(buf, "PNG", compress_level=1)
+        pool.append(buf.getvalue())
+    return pool
+
+
+def screenshot_name(rng, when, ext):
+    stamp = when.strftime("%Y-%m-%d_%H-%M-%S") + f".{when.microsecond // 1000:03d}"
+    return f"{stamp}-{rng.choice(LOCATIONS)}-{rng.choice(CHARACTERS)}.{ext}"
+
+
+def generate(out_dir, count=1000, size=(1920, 1080), png_ratio=0.5, malformed_ratio=0.05, seed=1):
+    """Write ``count`` files into ``out_dir``; return a small description dict."""
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    width, height = size
+    pools = {"png": _encoded_pool(width, height, "PNG", seed), "jpg": _encoded_pool(width, height, "JPEG", seed)}
+
+    when = datetime(2023, 1, 1, 12, 0, 0)
+    total_bytes = 0
+    malformed = 0
+    for n in range(count):
+        ext = "png" if rng.random() < png_ratio else "jpg"
+        when += timedelta(seconds=rng.randrange(1, 7200), milliseconds=rng.randrange(1000))
+        if rng.random() < malformed_ratio:
+            name = rng.choice(MALFORMED).format(n=n, ext=ext)
+            malformed += 1
+        else:
+            name = screenshot_name(rng, when, ext)
+        data = rng.choice(pools[ext]) + f"corpus-file-{n}".encode()
+        path = os.path.join(out_dir, name)
+        if os.path.exists(path):  # duplicate timestamp/name: keep the corpus size exact
+            base, dot_ext = os.path.splitext(path)
+            path = f"{base} ({n}){dot_ext}"
+        with open(path, "wb") as f:
+            f.write(data)
+        total_bytes += len(data)
+
+    return {
+        "count": count,
+        "size": f"{width}x{height}",
+        "png_ratio": png_ratio,
+        "malformed_ratio": malformed_ratio,
+        "malformed": malformed,
+        "bytes": total_bytes,
+        "seed": seed,
+    }
+
+
+def parse_size(value):
+    width, _, height = value.lower().partition("x")
+    return int(width), int(height)
+
+
+def add_corpus_args(parser):
+    parser.add_argument("--count", type=int, default=1000, help="number of files (default 1000)")
+    parser.add_argument("--size", type=parse_size, default=(1920, 1080), help="WIDTHxHEIGHT (default 1920x1080)")
+    parser.add_argument("--png-ratio", type=float, default=0.5, help="share of PNG files, rest JPEG (default 0.5)")
+    parser.add_argument("--malformed-ratio", type=float, default=0.05, help="share of unparseable names (default 0.05)")
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("out_dir")
+    add_corpus_args(parser)
+    args = parser.parse_args(argv)
+    info = generate(args.out_dir, args.count, args.size, args.png_ratio, args.malformed_ratio, args.seed)
+    print(f"Wrote {info['count']} files ({info['bytes'] / 1e6:.1f} MB, {info['malformed']} malformed) to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""Screenshot Sorter engine, usable without the GUI.
+
+Example::
+
+    from screenshot_sorter import SortEngine, SortSettings
+    SortEngine(SortSettings(source="C:/Screenshots"), emit=print).run()
+"""
+from .engine import (
+    SortEngine,
+    SortError,
+    SortSettings,
+    WatermarkSettings,
+    extract_info,
+    format_event,
+)
+from .watch import FolderWatcher
+from .watermark import WatermarkPool, render_watermark
+
+__all__ = [
+    "FolderWatcher",
+    "SortEngine",
+    "SortError",
+    "SortSettings",
+    "WatermarkPool",
+    "WatermarkSettings",
+    "extract_info",
+    "format_event",
+    "render_watermark",
+]
@@ -0,0 +1,256 @@
+"""Searchable catalog of the sorted tree: metadata in SQLite plus cached thumbnails.
+
+Filled in while sorting, so browsing never has to rescan the folders or open
+full-size screenshots: filtering 100k shots by zone or character is one
+indexed query, and each row points at a small JPEG thumbnail.
+"""
+import hashlib
+import os
+import sqlite3
+import time
+from collections import namedtuple
+
+from PIL import Image
+
+from .scan import ARCHIVE_DIRNAME, IMAGE_EXTS, THUMBNAIL_DIRNAME, is_sorted_output_dir
+from .transfer import discard, partial_path
+
+CATALOG_FILENAME = ".screenshot_sorter.catalog.sqlite"
+THUMBNAIL_SIZE = 256
+
+Shot = namedtuple("Shot", "path date zone character width height size thumbnail")
+
+
+def thumbnail_path(root, rel_path):
+    """Where the thumbnail of ``root/rel_path`` is cached (fanned out over 256 folders)."""
+    key = hashlib.blake2b(rel_path.replace(os.sep, "/").encode("utf-8"), digest_size=10).hexdigest()
+    return os.path.join(root, THUMBNAIL_DIRNAME, key[:2], key + ".jpg")
+
+
+def save_thumbnail(image, path, size=THUMBNAIL_SIZE):
+    """Write a JPEG thumbnail of ``image`` (left unmodified) to ``path``, atomically.
+
+    ``reduce`` box-averages down to about twice the thumbnail size first, so
+    the final resample only touches a few hundred pixels per side.
+    """
+    factor = max(1, max(image.size) // (size * 2))
+    thumb = image.reduce(factor) if factor > 1 else image.copy()
+    thumb.thumbnail((size, size), Image.BILINEAR)
+    if thumb.mode != "RGB":
+        thumb = thumb.convert("RGB")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = partial_path(path)
+    try:
+        thumb.save(tmp, "JPEG", quality=80)
+        os.replace(tmp, path)
+    except BaseException:
+        discard(tmp)
+        raise
+
+
+def describe(path, thumbnail=None, size=THUMBNAIL_SIZE):
+    """``(width, height, file_size)`` of the image at ``path``; also writes its ``thumbnail`` if given.
+
+    Without a thumbnail only the header is read. JPEGs are decoded at reduced
+    scale (``draft``), so a 4K shot costs a fraction of a full decode.
+    """
+    file_size = os.stat(path).st_size
+    with Image.open(path) as img:
+        width, height = img.size
+        if thumbnail is not None:
+            img.draft("RGB", (size, size))
+            save_thumbnail(img, thumbnail, size)
+    return width, height, file_size
+
+
+def sorted_files(root):
+    """``(path, folder_parts)`` of every image in the ``DD-MM-YYYY`` trees under ``root``.
+
+    ``folder_parts`` is ``[date]``, ``[date, zone]`` or ``[date, zone, character]``,
+    as the sort wrote them.
+    """
+    try:
+        with os.scandir(root) as it:
+            stack = [(e.path, [e.name]) for e in it if e.is_dir() and is_sorted_output_dir(e.name)
+                     and e.name not in (ARCHIVE_DIRNAME, THUMBNAIL_DIRNAME)]
+    except OSError:
+        return
+    while stack:
+        folder, parts = stack.pop()
+        try:
+            it = os.scandir(folder)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if len(parts) < 3:
+                        stack.append((entry.path, parts + [entry.name]))
+                elif entry.name.lower().endswith(IMAGE_EXTS):
+                    yield entry.path, parts
+
+
+def _iso_date(date_folder):
+    # "DD-MM-YYYY" → "YYYY-MM-DD", so dates sort and compare as text
+    day, month, year = date_folder.split("-")
+    return f"{year}-{month}-{day}"
+
+
+class Catalog:
+    """SQLite table of sorted screenshots under one output folder.
+
+    Paths (of the screenshot and its thumbnail) are stored relative to the
+    folder, so the tree can be moved or opened from another machine. Writes
+    are committed in batches of ``commit_every`` records.
+    """
+
+    def __init__(self, root, commit_every=200):
+        self.root = root
+        self.path = os.path.join(root, CATALOG_FILENAME)
+        self.commit_every = commit_every
+        self._uncommitted = 0
+        self._db = sqlite3.connect(self.path)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS shots (
+                path TEXT PRIMARY KEY,
+                date TEXT NOT NULL,
+                zone TEXT,
+                character TEXT,
+                width INTEGER,
+                height INTEGER,
+                size INTEGER NOT NULL,
+                thumbnail TEXT,
+                added_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS shots_zone ON shots(zone, date);
+            CREATE INDEX IF NOT EXISTS shots_character ON shots(character, date);
+            CREATE INDEX IF NOT EXISTS shots_date ON shots(date);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            """
+        )
+
+    @classmethod
+    def for_folder(cls, folder, create=True):
+        """Open the catalog of ``folder``; with ``create=False``, ``None`` if there is none yet."""
+        if not create and not os.path.exists(os.path.join(folder, CATALOG_FILENAME)):
+            return None
+        return cls(folder)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _rel(self, path):
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def record(self, path, date_folder, zone, character, width, height, size, thumbnail=None):
+        """Add or update the screenshot at ``path`` (sorted into ``date_folder``, ``DD-MM-YYYY``)."""
+        self._db.execute(
+            "INSERT OR REPLACE INTO shots (path, date, zone, character, width, height, size, thumbnail, added_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                self._rel(path), _iso_date(date_folder), zone, character, width, height, size,
+                self._rel(thumbnail) if thumbnail else None, time.time(),
+            ),
+        )
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self.commit()
+
+    def backfill(self, stop=None):
+        """Record the shots already in the sorted tree that the catalog lacks; ``None`` if done before.
+
+        Needed once per catalog: a library sorted before ``--catalog`` was used
+        (or an Option 2 destination whose files are all ``unchanged``) has no
+        rows otherwise. Later calls cost one query. If ``stop()`` turns true
+        it returns early, and the next call carries on.
+        """
+        if self._db.execute("SELECT 1 FROM meta WHERE key = 'backfilled'").fetchone():
+            return None
+        known = {row[0] for row in self._db.execute("SELECT path FROM shots")}
+        added = 0
+        for path, parts in sorted_files(self.root):
+            if stop is not None and stop():
+                return added
+            rel = self._rel(path)
+            if rel in known:
+                continue
+            thumbnail = thumbnail_path(self.root, rel)
+            try:
+                width, height, size = describe(path, thumbnail)
+            except Exception:  # unreadable image: listed all the same, just without a thumbnail
+                try:
+                    size = os.stat(path).st_size
+                except OSError:
+                    continue
+                width = height = thumbnail = None
+            zone, character = parts[1:3] if len(parts) == 3 else (None, None)
+            self.record(path, parts[0], zone, character, width, height, size, thumbnail)
+            added += 1
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('backfilled', '1')")
+        self.commit()
+        return added
+
+    def search(self, zone=None, character=None, date_from=None, date_to=None, text=None, limit=None, offset=0):
+        """Matching :class:`Shot` rows, newest first; paths come back absolute.
+
+        ``zone``/``character`` match exactly, ``date_from``/``date_to`` are
+        inclusive ``YYYY-MM-DD`` bounds, and ``text`` is a substring of the
+        zone, character or file path.
+        """
+        where, args = [], []
+        for column, value in (("zone", zone), ("character", character)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                args.append(value)
+        if date_from:
+            where.append("date >= ?")
+            args.append(date_from)
+        if date_to:
+            where.append("date <= ?")
+            args.append(date_to)
+        if text:
+            where.append("(zone LIKE ? OR character LIKE ? OR path LIKE ?)")
+            args += [f"%{text}%"] * 3
+        sql = "SELECT path, date, zone, character, width, height, size, thumbnail FROM shots"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY date DESC, path DESC"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            args += [limit, offset]
+        join = os.path.join
+        return [
+            Shot(join(self.root, row[0]), *row[1:7], join(self.root, row[7]) if row[7] else None)
+            for row in self._db.execute(sql, args)
+        ]
+
+    def zones(self):
+        """``{zone: count}`` for filter lists, alphabetically."""
+        return self._counts("zone")
+
+    def characters(self):
+        return self._counts("character")
+
+    def _counts(self, column):
+        rows = self._db.execute(
+            f"SELECT {column}, COUNT(*) FROM shots WHERE {column} IS NOT NULL GROUP BY {column} ORDER BY {column}"
+        )
+        return dict(rows)
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM shots").fetchone()[0]
+
+    def commit(self):
+        self._db.commit()
+        self._uncommitted = 0
+
+    def close(self):
+        if self._db is not None:
+            self.commit()
+            self._db.close()
+            self._db = None
@@ -0,0 +1,219 @@
+"""Headless command line front-end: ``python -m screenshot_sorter``."""
+import argparse
+import json
+import os
+import signal
+import sys
+
+from .dedupe import DEDUPE_MODES
+from .engine import MODES, SortEngine, SortError, SortSettings, WatermarkSettings, format_event
+from .stats import format_profile
+from .transfer import POLICIES
+from .watch import FolderWatcher
+from .watermark import POSITIONS, opacity_from_percent
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m screenshot_sorter",
+        description="Sort FFXIV screenshots into Date / Zone / Character folders.",
+    )
+    parser.add_argument("source", nargs="+", help="folder(s) containing the screenshots")
+    parser.add_argument(
+        "-r", "--recursive", action="store_true",
+        help="also scan subfolders (Archive and already sorted DD-MM-YYYY folders are skipped)",
+    )
+    parser.add_argument(
+        "--include", action="append", default=[], metavar="GLOB",
+        help="only sort images whose relative path or name matches (repeatable)",
+    )
+    parser.add_argument(
+        "--exclude", action="append", default=[], metavar="GLOB",
+        help="skip images/folders whose relative path or name matches (repeatable)",
+    )
+    parser.add_argument(
+        "--mode", choices=MODES, default="archive",
+        help="archive: move & archive in the source folder (default); copy: copy to --dest, source unchanged",
+    )
+    parser.add_argument("--dest", help="destination folder (required for --mode copy)")
+    parser.add_argument("--watermark", metavar="IMAGE", help="watermark image to apply to sorted screenshots")
+    parser.add_argument("--wm-position", choices=POSITIONS, default="bottom-right")
+    parser.add_argument("--wm-opacity", metavar="PCT", default="70", help="watermark opacity in %% (5–100, default 70)")
+    parser.add_argument(
+        "--archive-originals", action="store_true",
+        help="archive mode: keep the unwatermarked original in Archive and write the watermarked file once",
+    )
+    parser.add_argument(
+        "--transfer", choices=POLICIES, default="auto",
+        help="auto: reflink/kernel copy where possible (default); link: also allow hardlinks on "
+             "the same drive (the copies then share bytes); copy: always a plain byte copy",
+    )
+    parser.add_argument(
+        "--date-fallback", action="store_true",
+        help="sort images whose names no parser recognises by their EXIF/PNG date, else file date",
+    )
+    parser.add_argument(
+        "--catalog", action="store_true",
+        help="record sorted screenshots (date, zone, character, size) with thumbnails in a searchable "
+             "catalog next to the sorted tree",
+    )
+    parser.add_argument(
+        "--dedupe", choices=DEDUPE_MODES, default="off",
+        help="skip: leave files whose exact bytes are already sorted (or in Archive) where they are; "
+             "link: hardlink the existing copy into place instead (no watermark only)",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=os.cpu_count() or 1,
+        help="watermark worker processes (default: one per CPU; 1 = serial)",
+    )
+    parser.add_argument(
+        "--io-jobs", type=int, default=2, metavar="N",
+        help="files moved/copied at the same time, overlapping with watermarking (default 2; "
+             "raise for NAS/USB targets, 0 = one file at a time)",
+    )
+    parser.add_argument(
+        "--no-index", dest="incremental", action="store_false",
+        help="copy mode: ignore the destination's index and copy every file again",
+    )
+    parser.add_argument(
+        "-n", "--dry-run", action="store_true",
+        help="only show what would be moved/copied where; nothing on disk is changed",
+    )
+    parser.add_argument("--plan-out", metavar="PATH", help="write the full plan (JSON) to PATH")
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="continue an interrupted run (same source/--mode/--dest) without redoing finished files",
+    )
+    parser.add_argument(
+        "--restart", action="store_true",
+        help="discard an interrupted run and start over with a fresh scan",
+    )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="keep running and sort new screenshots as they arrive (stop with Ctrl+C)",
+    )
+    parser.add_argument(
+        "--settle", type=float, default=2.0, metavar="SECONDS",
+        help="watch: wait until a new file has not changed for this long before sorting it (default 2)",
+    )
+    parser.add_argument(
+        "--poll", action="store_true",
+        help="watch: check the folders periodically instead of using inotify (e.g. for network shares)",
+    )
+    parser.add_argument(
+        "--poll-interval", type=float, default=5.0, metavar="SECONDS",
+        help="watch: seconds between checks when polling (default 5)",
+    )
+    parser.add_argument("--profile", action="store_true", help="print per-stage timings at the end of the run")
+    parser.add_argument(
+        "--profile-dump", metavar="PATH",
+        help="write cProfile stats of the run to PATH (implies --profile); covers the engine and its "
+             "writer threads, but not watermark worker processes (-j above 1)",
+    )
+    parser.add_argument("--json", action="store_true", help="emit progress and results as JSON lines on stdout")
+    return parser
+
+
+def settings_from_args(args):
+    watermark = None
+    if args.watermark:
+        watermark = WatermarkSettings(
+            path=args.watermark,
+            position=args.wm_position,
+            opacity=opacity_from_percent(args.wm_opacity),
+        )
+    return SortSettings(
+        source=args.source[0],
+        extra_sources=args.source[1:],
+        recursive=args.recursive,
+        include=args.include,
+        exclude=args.exclude,
+        mode=args.mode,
+        dest=args.dest,
+        watermark=watermark,
+        jobs=max(1, args.jobs),
+        io_jobs=max(0, args.io_jobs),
+        incremental=args.incremental,
+        archive_originals=args.archive_originals,
+        transfer=args.transfer,
+        dedupe=args.dedupe,
+        date_fallback=args.date_fallback,
+        catalog=args.catalog,
+        profile=args.profile or bool(args.profile_dump),
+        profile_dump=args.profile_dump,
+        dry_run=args.dry_run,
+        plan_path=args.plan_out,
+        resume=args.resume,
+        restart=args.restart,
+    )
+
+
+def _json_emitter(stream):
+    def emit(event):
+        stream.write(json.dumps(event, ensure_ascii=False) + "\n")
+        stream.flush()
+    return emit
+
+
+def _text_emitter(stream):
+    def emit(event):
+        formatted = format_event(event)
+        if formatted is not None:
+            message, _, reason = formatted
+            stream.write(f"{message}  ({reason})\n" if reason else message + "\n")
+        elif event["event"] == "profile":
+            stream.write("\n".join(format_profile(event)) + "\n")
+        elif event["event"] == "watch":
+            if event["state"] == "watching":
+                stream.write(f"Watching {', '.join(event['sources'])} ({event['backend']}); press Ctrl+C to stop.\n")
+            else:
+                stream.write("Stopped watching.\n")
+        elif event["event"] == "error":
+            stream.write(f"error: {event['error']}\n")
+        elif event["event"] == "summary":
+            duplicates = ""
+            if event["duplicates"]:
+                duplicates = f", {event['duplicates']} duplicates ({event['bytes_saved'] / 1e6:.1f} MB saved)"
+            stream.write(
+                f"{event['status'].capitalize()}: {event['ok']} ok, "
+                f"{event['unchanged']} unchanged, {event['skipped']} skipped{duplicates}\n"
+            )
+    return emit
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    emit = _json_emitter(sys.stdout) if args.json else _text_emitter(sys.stdout)
+    settings = settings_from_args(args)
+    if args.watch:
+        return _watch(args, settings, emit)
+    engine = SortEngine(settings, emit=emit)
+    try:
+        summary = engine.run()
+    except SortError as e:
+        if args.json:
+            emit({"event": "error", "error": str(e)})
+        else:
+            print(f"error: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        return 130
+    return 0 if summary["status"] in ("completed", "planned") else 1
+
+
+def _watch(args, settings, emit):
+    watcher = FolderWatcher(
+        settings, emit, settle=max(0.0, args.settle), poll_interval=max(0.1, args.poll_interval), polling=args.poll,
+    )
+    signal.signal(signal.SIGTERM, lambda *_: watcher.stop())
+    try:
+        watcher.run()
+    except SortError as e:
+        if args.json:
+            emit({"event": "error", "error": str(e)})
+        else:
+            print(f"error: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        return 130
+    return 0
@@ -0,0 +1,99 @@
+"""Content-based duplicate detection: the same screenshot stored under another name."""
+import os
+
+from .index import file_hash
+from .scan import IMAGE_EXTS, THUMBNAIL_DIRNAME, is_sorted_output_dir
+
+DEDUPE_MODES = ("off", "skip", "link")
+
+
+class ContentIndex:
+    """Finds files with identical bytes, hashing as little as possible.
+
+    Files are bucketed by size, which costs one ``stat`` each; a file is only
+    hashed once another file of exactly the same size turns up, and each
+    digest is computed at most once. Every known file has a *read* path (where
+    its bytes are now) and a *report* path (where they are or will be sorted
+    to), so a file planned earlier in the same run counts before it is copied.
+    An index can outlive the run that built it (watch mode): once a file is
+    moved, it is read from its report path, and matches whose file has since
+    been deleted are ignored.
+    """
+
+    def __init__(self, hasher=file_hash):
+        self.hasher = hasher
+        self.hashed = 0  # files read in full, for stats
+        self._by_size = {}  # size -> [[read_path, report_path, digest or None], ...]
+
+    def add(self, path, size, report_path=None, digest=None):
+        self._by_size.setdefault(size, []).append([path, report_path or path, digest])
+
+    def add_tree(self, folder):
+        """Index every image below ``folder`` (sizes only; nothing is read yet), except thumbnails."""
+        stack = [folder]
+        while stack:
+            try:
+                it = os.scandir(stack.pop())
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name != THUMBNAIL_DIRNAME:
+                            stack.append(entry.path)
+                    elif entry.name.lower().endswith(IMAGE_EXTS):
+                        try:
+                            self.add(entry.path, entry.stat().st_size)
+                        except OSError:
+                            pass
+
+    def add_sorted_trees(self, root):
+        """Index the ``DD-MM-YYYY`` folders and ``Archive`` of an Option 1 source folder."""
+        try:
+            with os.scandir(root) as it:
+                dirs = [e.path for e in it
+                        if e.is_dir() and is_sorted_output_dir(e.name) and e.name != THUMBNAIL_DIRNAME]
+        except OSError:
+            return
+        for path in dirs:
+            self.add_tree(path)
+
+    def _digest(self, path):
+        self.hashed += 1
+        return self.hasher(path)
+
+    def match(self, path, size, digest=None, prefer=None):
+        """``(report_path, digest)`` of a known file with the same bytes as ``path``.
+
+        ``report_path`` is ``None`` if there is none; ``digest`` is ``None`` if
+        no other file had the same size, so nothing needed to be read. With
+        ``prefer``, a match whose report path passes it wins over earlier ones.
+        """
+        bucket = self._by_size.get(size)
+        if not bucket:
+            return None, digest
+        if digest is None:
+            digest = self._digest(path)
+        found = None
+        for known in bucket:
+            if known[2] is None:
+                known[2] = self._known_digest(known)
+            if known[2] == digest and self._exists(known):
+                if prefer is None or prefer(known[1]):
+                    return known[1], digest
+                found = found or known[1]
+        return found, digest
+
+    def _known_digest(self, known):
+        # Read from where it was found, or from where it was sorted to since
+        for path in dict.fromkeys(known[:2]):
+            try:
+                return self._digest(path)
+            except OSError:
+                pass
+        return ""  # vanished since it was indexed
+
+    @staticmethod
+    def _exists(known):
+        """A match is only worth reporting while its bytes are still there (a kept index can go stale)."""
+        return os.path.exists(known[1]) or os.path.exists(known[0])
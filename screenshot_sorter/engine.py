@@ -0,0 +1,920 @@
+"""The sort engine: scans a source folder and moves/copies screenshots into
+``date/location/character`` folders (just ``date`` for names without a location),
+optionally watermarking them.
+
+The engine has no GUI dependency. Front-ends pass an ``emit`` callable that
+receives plain ``dict`` events (JSON-serialisable), see :func:`format_event`.
+"""
+import cProfile
+import os
+import pstats
+import shutil
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass, field, replace
+from typing import List, Optional
+
+from .catalog import Catalog, describe, thumbnail_path
+from .dedupe import DEDUPE_MODES, ContentIndex
+from .index import ProcessedIndex, file_hash
+from .journal import Journal
+from .parsers import PARSERS, ParserChain
+from .plan import PlannedFile, SortPlan
+from .scan import ARCHIVE_DIRNAME, NameReserver, scan_sources
+from .stats import StageStats
+from .transfer import POLICIES, Transfer, discard, fsync_dir, partial_path
+from .pipeline import Pipeline
+from .watermark import WatermarkPool
+
+MODES = ("archive", "copy")
+
+_NO_TIMER = nullcontext()
+
+_UNRECOGNIZED = "Filename does not match a known screenshot naming scheme."
+_MISSING = "File disappeared while the run was interrupted."
+
+# Short log labels for skip reasons
+_SKIP_LABELS = {_UNRECOGNIZED: "Unrecognized format", _MISSING: "Missing"}
+
+
+@dataclass
+class WatermarkSettings:
+    path: str
+    position: str = "bottom-right"
+    opacity: float = 0.7  # 0.05 – 1.0
+
+
+@dataclass
+class SortSettings:
+    source: str
+    mode: str = "archive"  # "archive": move & archive in source, "copy": copy to dest
+    dest: Optional[str] = None
+    watermark: Optional[WatermarkSettings] = None
+    jobs: int = 1  # watermark worker processes
+    io_jobs: int = 2  # writer threads for moves/copies, overlapping with encoding (0 = on the sorting thread)
+    incremental: bool = True  # copy mode: skip files recorded in the destination's index
+    archive_originals: bool = False  # archive mode + watermark: Archive keeps the unwatermarked original
+    extra_sources: List[str] = field(default_factory=list)  # more source roots for the same run
+    recursive: bool = False  # also scan subfolders (skips Archive and sorted date trees)
+    include: List[str] = field(default_factory=list)  # glob patterns; empty = every image
+    exclude: List[str] = field(default_factory=list)
+    transfer: str = "auto"  # "auto" (reflink/kernel copy), "link" (allow hardlinks), "copy"
+    profile: bool = False  # record per-stage latency histograms (emitted as a "profile" event)
+    profile_dump: Optional[str] = None  # also write cProfile stats of the run to this path
+    dry_run: bool = False  # plan only: emit "planned" events, change nothing on disk
+    plan_path: Optional[str] = None  # write the plan (JSON) to this path before executing it
+    resume: bool = False  # continue the interrupted run journaled in the output folder
+    restart: bool = False  # discard an interrupted run's journal and start from scratch
+    dedupe: str = "off"  # "skip"/"link" files whose bytes already exist in the sorted tree or Archive
+    date_fallback: bool = False  # sort names no parser knows by EXIF/PNG date or mtime (date folder only)
+    catalog: bool = False  # record sorted files (date/zone/character/size) with thumbnails, see catalog.py
+
+    @property
+    def sources(self):
+        return [self.source] + list(self.extra_sources)
+
+
+class SortError(Exception):
+    """Raised for invalid settings before any file is touched."""
+
+
+def extract_info(filename):
+    """Return ``(date_folder, location, character)`` or three ``None``s.
+
+    Names that carry only a date (e.g. the vanilla client's) give ``None`` for
+    location and character.
+    """
+    for parser in PARSERS:
+        parsed = parser.parse(filename)
+        if parsed is not None:
+            return parsed[:3]
+    return None, None, None
+
+
+def format_event(event):
+    """Human-readable ``(message, tag, reason)`` for a log-worthy event, else ``None``.
+
+    ``tag`` is ``"success"`` or ``"error"``; ``reason`` is set for errors only.
+    """
+    kind = event["event"]
+    if kind == "file":
+        name = os.path.basename(event["target"] or event["source"])
+        status = event["status"]
+        if status == "skipped":
+            return f"[SKIPPED] {name} – {_SKIP_LABELS.get(event['reason'], 'Skipped')}", "error", event["reason"]
+        if status == "unchanged":
+            return None  # already sorted by a previous run; not worth a log line
+        if status == "duplicate":
+            return f"[DUPLICATE] {name} = {event['duplicate_of']}", "success", None
+        return f"[{status.upper()}] {name} → {event['folder']}", "success", None
+    if kind == "planned":
+        name = os.path.basename(event["target"] or event["source"])
+        action = event["action"]
+        if action == "skip":
+            return f"[PLAN SKIP] {name} – Unrecognized format", "error", event["reason"]
+        if action == "unchanged":
+            return None
+        if action == "duplicate":
+            return f"[PLAN DUPLICATE] {name} = {event['duplicate_of']}", "success", None
+        return f"[PLAN {action.upper()}] {name} → {event['folder']}", "success", None
+    if kind == "catalog":
+        return f"[CATALOG] {event['added']} already sorted screenshots added to {event['root']}", "success", None
+    if kind == "watermark":
+        name = os.path.basename(event["path"])
+        if event["error"] is None:
+            return f"[WATERMARK] applied to {name}", "success", None
+        return f"[WATERMARK FAILED] {name}", "error", event["error"]
+    return None
+
+
+class SortEngine:
+    """Runs one sort job. ``run()`` blocks; ``pause``/``resume``/``cancel`` are thread-safe.
+
+    Events emitted, in order:
+
+    * ``{"event": "start", "total": n, "resumed": n, ...}`` – ``resumed`` files were
+      already finished by the interrupted run being resumed
+    * ``{"event": "file", "status": "moved"|"copied"|"duplicate"|"unchanged"|"skipped",
+      "source", "target", "folder", "reason", "duplicate_of", "done", "total"}`` – one
+      per image; skipped and unchanged files first, then the rest grouped by target
+      folder, hardlinked duplicates last
+    * ``{"event": "planned", "action": "move"|"copy"|"duplicate"|"unchanged"|"skip",
+      "source", "target", "archive", "folder", "reason", "duplicate_of", "size", "done",
+      "total"}`` – instead of ``file`` events with ``settings.dry_run``
+    * ``{"event": "watermark", "path", "error"}`` – before the file event it belongs to
+    * ``{"event": "catalog", "root", "added"}`` – with ``settings.catalog``, before the
+      first file event, when shots sorted by earlier runs were added to the catalog
+    * ``{"event": "profile", "wall_s", "stages", "profile_dump"}`` – only with
+      ``settings.profile``; ``stages`` is :meth:`StageStats.summary`
+    * ``{"event": "summary", "status": "completed"|"planned"|"cancelled", "ok", "unchanged",
+      "skipped", "duplicates", "bytes_saved", "parsers", "total", "elapsed_s",
+      "transfers"}`` – ``transfers`` counts how files were moved/copied (``{"rename": n,
+      "reflink": n, "hardlink": n, "copy": n}``); ``bytes_saved`` is the size of all
+      duplicates; ``parsers`` counts which naming scheme matched how many files
+    """
+
+    def __init__(self, settings, emit=None):
+        self.settings = settings
+        self.emit = emit or (lambda event: None)
+        self.stats = StageStats() if settings.profile or settings.profile_dump else None
+        if self.stats is not None:
+            self.emit = self._timed_emit(self.emit)
+        self.total = 0
+        self.done = 0
+        self.ok_count = 0
+        self.unchanged_count = 0
+        self.skip_count = 0
+        self.duplicate_count = 0
+        self.bytes_saved = 0
+        self.transfers = Counter()
+        self._transfers_lock = threading.Lock()  # writer threads count their transfers
+        self._thread_profiles = [] if settings.profile_dump else None  # one per pipeline thread
+        # Dedupe's view of the output; built on first use unless handed over (watch mode keeps one)
+        self.content = None
+        self._journal = None
+        self._catalogs = {}  # output root -> Catalog, opened on first use
+        self._parsers = ParserChain()
+        self._transfer = Transfer(settings.transfer if settings.transfer in POLICIES else "auto")
+        self._cancel_evt = threading.Event()
+        self._resume_evt = threading.Event()
+        self._resume_evt.set()
+
+    # ------ controls ------
+    def pause(self):
+        self._resume_evt.clear()
+
+    def resume(self):
+        self._resume_evt.set()
+
+    def cancel(self):
+        self._cancel_evt.set()
+        self._resume_evt.set()  # wake a paused run so it can exit
+
+    @property
+    def paused(self):
+        return not self._resume_evt.is_set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_evt.is_set()
+
+    def _should_stop(self):
+        """Checked between files: blocks while paused, True once cancelled."""
+        self._resume_evt.wait()
+        return self._cancel_evt.is_set()
+
+    # ------ run ------
+    def validate(self):
+        s = self.settings
+        if s.mode not in MODES:
+            raise SortError(f"Unknown mode {s.mode!r} (expected one of {', '.join(MODES)}).")
+        if s.transfer not in POLICIES:
+            raise SortError(f"Unknown transfer policy {s.transfer!r} (expected one of {', '.join(POLICIES)}).")
+        if s.dedupe not in DEDUPE_MODES:
+            raise SortError(f"Unknown dedupe mode {s.dedupe!r} (expected one of {', '.join(DEDUPE_MODES)}).")
+        for source in s.sources:
+            if not source or not os.path.isdir(source):
+                raise SortError("Please select a valid source folder." if source == s.source
+                                else f"Source folder not found: {source}")
+        if s.mode == "copy" and (not s.dest or not os.path.isdir(s.dest)):
+            raise SortError("Please select a valid destination folder.")
+        if s.watermark is not None and not os.path.isfile(s.watermark.path):
+            raise SortError(f"Watermark image not found: {s.watermark.path}")
+        if not s.dry_run:
+            interrupted = self.interrupted_run()
+            if s.resume and interrupted is None:
+                raise SortError("There is no interrupted run to resume.")
+            if interrupted is not None and not s.resume and not s.restart:
+                raise SortError(f"An interrupted run was found ({interrupted}). "
+                                "Resume it (--resume) or start over (--restart).")
+
+    def run(self, entries=None):
+        """Validate, sort, and return the summary event.
+
+        ``entries`` (:class:`~.scan.ImageEntry` objects) replaces the scan of
+        the source folders, e.g. with the files watch mode saw arrive.
+        """
+        self.validate()
+        if not self.settings.profile_dump:
+            return self._run(entries)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return self._run(entries)
+        finally:
+            profiler.disable()
+            # Moves, copies and catalog work run on the pipeline's threads: merge their profiles in
+            stats = pstats.Stats(profiler)
+            for thread_profile in self._thread_profiles:
+                stats.add(thread_profile)
+            stats.dump_stats(self.settings.profile_dump)
+
+    def _run(self, entries=None):
+        s = self.settings
+        started = time.perf_counter()
+        plan, completed = None, set()
+        if s.resume and not s.dry_run:
+            # The journal holds the whole plan; no scan, and finished files are never redone
+            with self._timed("journal"):
+                plan, completed = self._load_journal()
+            s = self.settings
+            self.total = len(plan)
+            self.done = len(completed)
+        elif entries is not None:
+            entries = list(entries)
+            self.total = len(entries)
+        else:
+            # One scandir pass over every root both sizes the progress bar and feeds the sort loop
+            with self._timed("scan"):
+                entries = list(scan_sources(
+                    s.sources,
+                    recursive=s.recursive,
+                    include=s.include,
+                    exclude=s.exclude,
+                    skip_dirs=[s.dest] if s.mode == "copy" else [],
+                ))
+            self.total = len(entries)
+        self.emit({
+            "event": "start",
+            "mode": s.mode,
+            "sources": s.sources,
+            "dest": s.dest,
+            "total": self.total,
+            "resumed": self.done,
+        })
+
+        with self._open_index(s.dest) if s.mode == "copy" else nullcontext(None) as index:
+            if plan is None:
+                # Parse and resolve every name first; nothing on disk changes until the plan is complete
+                with self._timed("plan"):
+                    plan = self.build_plan(entries, index)
+            if s.plan_path and not self.cancelled:
+                plan.write_json(s.plan_path)
+            if s.dry_run:
+                self._emit_plan(plan)
+            elif not self.cancelled:
+                self._execute_journaled(plan, index, completed)
+
+        elapsed = time.perf_counter() - started
+        if self.stats is not None:
+            self.emit({
+                "event": "profile",
+                "wall_s": round(elapsed, 3),
+                "stages": self.stats.summary(),
+                "profile_dump": s.profile_dump,
+            })
+        summary = {
+            "event": "summary",
+            "status": "cancelled" if self.cancelled else "planned" if s.dry_run else "completed",
+            "ok": self.ok_count,
+            "unchanged": self.unchanged_count,
+            "skipped": self.skip_count,
+            "duplicates": self.duplicate_count,
+            "bytes_saved": self.bytes_saved,
+            "parsers": dict(self._parsers.hits),
+            "total": self.total,
+            "elapsed_s": round(elapsed, 3),
+            "transfers": dict(self.transfers),
+        }
+        self.emit(summary)
+        return summary
+
+    def _file_done(self, status, source, target=None, folder=None, reason=None, duplicate_of=None):
+        self.done += 1
+        if status == "skipped":
+            self.skip_count += 1
+        elif status == "unchanged":
+            self.unchanged_count += 1
+        elif status == "duplicate":
+            self.duplicate_count += 1
+        else:
+            self.ok_count += 1
+        self.emit({
+            "event": "file",
+            "status": status,
+            "source": source,
+            "target": target,
+            "folder": folder,
+            "reason": reason,
+            "duplicate_of": duplicate_of,
+            "done": self.done,
+            "total": self.total,
+        })
+
+    # ------ instrumentation (no-ops unless settings.profile) ------
+    def _timed(self, stage, nbytes=0):
+        if self.stats is None:
+            return _NO_TIMER
+        return self.stats.time(stage, nbytes)
+
+    def _timed_emit(self, emit):
+        def timed(event):
+            with self.stats.time("emit"):
+                emit(event)
+        return timed
+
+    # Called from the pipeline's writer threads
+    def _copy(self, src, dst, stage="copy", nbytes=0):
+        with self._timed(stage, nbytes):
+            self._count_transfer(self._transfer.copy(src, dst))
+
+    def _link(self, src, dst):
+        with self._timed("link"):
+            self._count_transfer(self._transfer.link(src, dst))
+
+    def _move(self, src, dst, nbytes=0):
+        with self._timed("move", nbytes):
+            self._count_transfer(self._transfer.move(src, dst))
+
+    def _remove_source(self, src, *written):
+        """Delete ``src`` once the files that replace it are sure to survive a power cut."""
+        with self._timed("sync"):
+            for folder in dict.fromkeys(os.path.dirname(path) for path in written):
+                fsync_dir(folder)
+        os.unlink(src)
+
+    def _count_transfer(self, how):
+        with self._transfers_lock:
+            self.transfers[how] += 1
+
+    def _parse(self, entry):
+        with self._timed("parse"):
+            parsed = self._parsers.parse(entry.name)
+        if parsed is None and self.settings.date_fallback:
+            with self._timed("parse.metadata"):
+                parsed = self._parsers.date_taken(entry.path, entry.stat().st_mtime)
+        return parsed
+
+    def _reserve(self, names, folder, filename):
+        # First use of a folder includes listing it
+        with self._timed("reserve"):
+            return names.reserve(folder, filename)
+
+    def _make_pipeline(self):
+        """The execution pipeline: watermark workers (if any) plus ``io_jobs`` writer threads."""
+        s = self.settings
+        wm = s.watermark
+        if wm is None:
+            return Pipeline(io_workers=s.io_jobs, stats=self.stats, profiles=self._thread_profiles)
+        return WatermarkPool(
+            wm.path, wm.position, wm.opacity,
+            workers=s.jobs,
+            on_result=self._on_watermark_result,
+            stats=self.stats,
+            io_workers=s.io_jobs,
+            profiles=self._thread_profiles,
+        )
+
+    def _on_watermark_result(self, filepath, error):
+        self.emit({"event": "watermark", "path": filepath, "error": error})
+
+    # ------ planning ------
+    def _open_index(self, folder):
+        if not self.settings.incremental:
+            return nullcontext(None)
+        if self.settings.dry_run:
+            # Read what's there, but a dry run never creates an index file
+            index = ProcessedIndex.for_folder(folder, create=False)
+            return index if index is not None else nullcontext(None)
+        return ProcessedIndex.for_folder(folder)
+
+    def build_plan(self, entries, index=None):
+        """Decide every file's fate without touching the disk (beyond reads).
+
+        Each name is parsed once and every target is collision-resolved up front;
+        in copy mode ``index`` (a :class:`ProcessedIndex`) marks files already
+        copied by a previous run as ``unchanged``. With ``settings.dedupe``, files
+        whose bytes already exist in the output (or earlier in this plan) become
+        ``duplicate`` items.
+        """
+        s = self.settings
+        plan = SortPlan(s.mode)
+        names = NameReserver()
+        single_pass = s.watermark is not None and s.archive_originals
+        content = self._content_index() if s.dedupe != "off" else None
+        # A watermarked output never equals its original, so there is nothing to link to
+        link_duplicates = s.dedupe == "link" and s.watermark is None
+        for entry in entries:
+            if self._should_stop():
+                break
+            file = entry.name
+            parsed = self._parse(entry)
+            if parsed is None:
+                plan.add(PlannedFile("skip", entry.path, reason=_UNRECOGNIZED))
+                continue
+            # Date-only names (vanilla client, metadata fallback) go straight into the date folder
+            parts = [p for p in parsed[:3] if p]
+            subdir = "/".join(parts)
+            st = entry.stat()
+
+            digest = None
+            if index is not None:
+                with self._timed("index"):
+                    unchanged = index.is_unchanged(entry.path, st.st_size, st.st_mtime_ns)
+                if unchanged:
+                    plan.add(PlannedFile("unchanged", entry.path, folder=subdir, size=st.st_size))
+                    continue
+                with self._timed("hash", st.st_size):
+                    digest = file_hash(entry.path)
+                with self._timed("index"):
+                    known_target = index.target_for_hash(digest)
+                if known_target is not None:
+                    # Same bytes were copied before under another source path
+                    plan.add(PlannedFile("unchanged", entry.path, known_target, folder=subdir,
+                                         size=st.st_size, mtime_ns=st.st_mtime_ns, digest=digest))
+                    continue
+
+            out_root = (entry.root or s.source) if s.mode == "archive" else s.dest
+            dest_dir = os.path.join(out_root, *parts)
+            archive_dir = os.path.join(out_root, ARCHIVE_DIRNAME)
+            duplicate_of = None
+            if content is not None:
+                # A sorted copy is what gets linked; Archive only holds originals
+                with self._timed("dedupe", st.st_size):
+                    duplicate_of, digest = content.match(
+                        entry.path, st.st_size, digest,
+                        prefer=lambda path: os.path.dirname(path) != archive_dir)
+                # Linking a copy into the folder that already holds it would only add a "(1)" name
+                # (a re-sorted file, or an original re-imported under its archived name): the
+                # source is simply redundant. A renamed or re-dated copy is linked into its own folder
+                home = duplicate_of is not None and (
+                    os.path.dirname(duplicate_of) == dest_dir
+                    or os.path.normcase(duplicate_of) == os.path.normcase(os.path.join(archive_dir, file)))
+                if duplicate_of is not None and (not link_duplicates or home):
+                    plan.add(PlannedFile("duplicate", entry.path, folder=subdir, duplicate_of=duplicate_of,
+                                         size=st.st_size, mtime_ns=st.st_mtime_ns, digest=digest,
+                                         remove_source=link_duplicates and s.mode == "archive"))
+                    continue
+
+            dest_path = self._reserve(names, dest_dir, file)
+            archive_target = None
+            if s.mode == "archive":
+                # The single pass archives the untouched original under its own name;
+                # otherwise the archive copy is taken from the sorted file
+                archive_name = file if single_pass else os.path.basename(dest_path)
+                archive_target = self._reserve(names, archive_dir, archive_name)
+            if duplicate_of is not None:
+                action = "duplicate"
+            else:
+                action = "move" if s.mode == "archive" else "copy"
+                if content is not None:
+                    content.add(entry.path, st.st_size, dest_path, digest)
+            plan.add(PlannedFile(action, entry.path, dest_path, archive_target, subdir, duplicate_of=duplicate_of,
+                                 size=st.st_size, mtime_ns=st.st_mtime_ns, digest=digest))
+        return plan
+
+    def _content_index(self):
+        """Sizes of every image already in the output: the sorted tree(s) and Archive."""
+        if self.content is not None:
+            return self.content
+        s = self.settings
+        content = self.content = ContentIndex()
+        with self._timed("dedupe.scan"):
+            if s.mode == "copy":
+                content.add_tree(s.dest)
+            else:
+                for root in s.sources:
+                    content.add_sorted_trees(root)
+        return content
+
+    def _emit_plan(self, plan):
+        for item in plan.in_execution_order():
+            self.done += 1
+            if item.action == "skip":
+                self.skip_count += 1
+            elif item.action == "unchanged":
+                self.unchanged_count += 1
+            elif item.action == "duplicate":
+                self.duplicate_count += 1
+                self.bytes_saved += item.size
+            else:
+                self.ok_count += 1
+            event = {"event": "planned", **item.to_dict(), "done": self.done, "total": self.total}
+            self.emit(event)
+
+    # ------ execution ------
+    def journal_path(self):
+        """Where this run's write-ahead journal lives (next to the sorted output)."""
+        s = self.settings
+        return Journal.path_for(s.dest if s.mode == "copy" else s.source)
+
+    def interrupted_run(self):
+        """Path of an interrupted run's journal that :attr:`SortSettings.resume` would pick up, else ``None``."""
+        s = self.settings
+        if not (s.dest if s.mode == "copy" else s.source):
+            return None
+        path = self.journal_path()
+        return path if os.path.exists(path) else None
+
+    def _journal_header(self):
+        s = self.settings
+        return {
+            "sources": [os.path.abspath(p) for p in s.sources],
+            "dest": os.path.abspath(s.dest) if s.dest else None,
+            "watermark": asdict(s.watermark) if s.watermark is not None else None,
+            "archive_originals": s.archive_originals,
+            "incremental": s.incremental,
+            "catalog": s.catalog,
+        }
+
+    def _load_journal(self):
+        """Plan and finished indices of the interrupted run; its settings replace ours."""
+        try:
+            header, plan, completed = Journal.load(self.journal_path())
+        except (OSError, ValueError) as e:
+            raise SortError(f"Can't resume the interrupted run: {e}")
+        if header["mode"] != self.settings.mode:
+            raise SortError(f"The interrupted run used mode {header['mode']!r}, not {self.settings.mode!r}.")
+        wm = header["watermark"]
+        self.settings = replace(
+            self.settings,
+            watermark=WatermarkSettings(**wm) if wm is not None else None,
+            archive_originals=header["archive_originals"],
+            incremental=header["incremental"],
+            catalog=header.get("catalog", False),
+        )
+        return plan, completed
+
+    def _execute_journaled(self, plan, index, completed):
+        s = self.settings
+
+        def before_sync():
+            if index is not None:
+                index.commit()
+            for catalog in self._catalogs.values():
+                catalog.commit()
+        if s.resume:
+            journal = Journal(self.journal_path(), before_sync=before_sync)
+        else:
+            with self._timed("journal"):
+                journal = Journal.create(self.journal_path(), self._journal_header(), plan, before_sync=before_sync)
+        self._journal = journal
+        try:
+            self.execute_plan(plan, index, completed, resume=s.resume)
+        except BaseException:
+            journal.close(finished=False)
+            raise
+        finally:
+            self._journal = None
+        # A cancelled run stays resumable; a finished one needs no journal
+        journal.close(finished=not self.cancelled)
+
+    def execute_plan(self, plan, index=None, completed=(), resume=False):
+        """Carry out ``plan`` folder by folder, creating each target directory once.
+
+        Items whose index (in execution order) is in ``completed`` are skipped.
+        With ``resume``, what is left of every other item is judged from the
+        disk first (see :meth:`_remaining`), so nothing is done twice.
+
+        Files go through a :class:`~.pipeline.Pipeline`: reads, watermark
+        encoding and writes of neighbouring files overlap, while events, the
+        journal and the index are still updated here, in plan order.
+        """
+        try:
+            if self.settings.catalog:
+                self._backfill_catalogs()
+            self._execute(plan, index, completed, resume)
+        finally:
+            for catalog in self._catalogs.values():
+                catalog.close()
+            self._catalogs.clear()
+
+    def _execute(self, plan, index, completed, resume):
+        made = set()
+        linking = False
+        with self._make_pipeline() as pipeline:
+            for i, item in enumerate(plan.in_execution_order()):
+                if i in completed:
+                    continue
+                if self._should_stop():
+                    break
+                step = self._remaining(item) if resume else item.action
+                if step == "skip":
+                    pipeline.defer(lambda i=i, item=item: self._item_done(i, item, "skipped"))
+                    continue
+                if step == "unchanged":
+                    pipeline.defer(lambda i=i, item=item: self._finish_unchanged(i, item, index))
+                    continue
+                if step == "missing":
+                    pipeline.defer(lambda i=i, item=item: self._item_done(i, item, "skipped", _MISSING))
+                    continue
+                if item.action == "duplicate" and not (item.target or item.remove_source):
+                    pipeline.defer(lambda i=i, item=item: self._finish_duplicate(i, item, index))
+                    continue
+                if item.action == "duplicate" and not linking:
+                    # Hardlinks may point at files copied earlier in this run: let those land first
+                    pipeline.drain()
+                    linking = True
+                if item.remove_source:
+                    self._remove_duplicate(i, item, pipeline, index)
+                    continue
+                for path in (item.target, item.archive):
+                    folder = os.path.dirname(path) if path else None
+                    if folder and folder not in made:
+                        with self._timed("mkdir"):
+                            os.makedirs(folder, exist_ok=True)
+                        made.add(folder)
+                if item.action == "move":
+                    self._move_and_archive(i, item, pipeline, step)
+                elif item.action == "copy":
+                    self._copy_to_destination(i, item, pipeline, index, step)
+                else:
+                    self._link_duplicate(i, item, pipeline, index, step)
+
+    def _remaining(self, item):
+        """What is left of ``item`` after an interrupted run, judged from what exists.
+
+        Every write lands atomically and a source is only removed once its
+        targets are complete, so existence alone tells the steps apart.
+        """
+        for path in (item.target, item.archive):
+            if path:
+                discard(partial_path(path))  # half-written when the run stopped
+        exists = os.path.exists
+        if item.action == "duplicate" and item.target:
+            # Archive mode removes the source last; copy mode is done once the link exists
+            done = not exists(item.source) if item.archive is not None else exists(item.target)
+            if done:
+                return "finish"
+            return "duplicate" if exists(item.duplicate_of) else "missing"
+        if item.action == "copy":
+            if exists(item.target):
+                return "finish"
+            return "copy" if exists(item.source) else "missing"
+        if item.action != "move" or exists(item.source):
+            return item.action
+        if self.settings.watermark is not None and self.settings.archive_originals:
+            # Original already in Archive; the watermarked copy may still be missing
+            if exists(item.target):
+                return "finish"
+            return "render" if exists(item.archive) else "missing"
+        if exists(item.archive):
+            return "finish"
+        return "archive" if exists(item.target) else "missing"
+
+    def _item_done(self, i, item, status, reason=None):
+        if status == "duplicate":
+            self.bytes_saved += item.size
+        self._file_done(status, item.source, item.target, item.folder, reason or item.reason, item.duplicate_of)
+        if self._journal is not None:
+            self._journal.done(i)
+
+    def _finish_unchanged(self, i, item, index):
+        if item.digest is not None and index is not None:
+            # Known by content only: remember this source path too
+            index.record(item.source, item.size, item.mtime_ns, item.digest, item.target)
+        self._item_done(i, item, "unchanged")
+
+    def _prefetch(self, item):
+        """Source worth reading ahead: one that is decoded or byte-copied, not just renamed or cloned."""
+        if self.settings.watermark is not None or not self._transfer.same_filesystem(item.source, item.target):
+            return item.source
+        return None
+
+    # ------ Catalog ------
+    def _new_shot(self, item):
+        """Catalog entry for ``item``, filled in on a writer thread; ``None`` without ``settings.catalog``."""
+        if not self.settings.catalog or not item.target:
+            return None
+        root = os.path.dirname(item.target)
+        for _ in item.folder.split("/"):
+            root = os.path.dirname(root)
+        return {"root": root, "thumbnail": thumbnail_path(root, os.path.relpath(item.target, root)), "info": None}
+
+    def _describe(self, shot, path, rendered=False):
+        """Writer thread: size and dimensions of ``path`` and its thumbnail (unless the renderer made it)."""
+        if shot is None:
+            return
+        thumbnail = shot["thumbnail"]
+        if rendered and os.path.exists(thumbnail):
+            thumbnail = None
+        try:
+            with self._timed("catalog"):
+                shot["info"] = describe(path, thumbnail)
+        except Exception:  # unreadable image: it is sorted all the same, just not browsable
+            shot["thumbnail"] = None
+
+    def _finish_later(self, pipeline, shot, path, done):
+        """Queue ``done``, describing ``path`` for the catalog first if there is one."""
+        if shot is None:
+            pipeline.defer(done)
+        else:
+            pipeline.write(lambda: self._describe(shot, path), done)
+
+    def _catalog(self, root):
+        catalog = self._catalogs.get(os.path.abspath(root))
+        if catalog is None:
+            catalog = self._catalogs[os.path.abspath(root)] = Catalog.for_folder(root)
+        return catalog
+
+    def _backfill_catalogs(self):
+        """Catalog what earlier runs sorted without ``--catalog`` (once per output folder)."""
+        s = self.settings
+        for root in [s.dest] if s.mode == "copy" else s.sources:
+            with self._timed("catalog"):
+                added = self._catalog(root).backfill(self._should_stop)
+            if added:
+                self.emit({"event": "catalog", "root": root, "added": added})
+
+    def _catalog_record(self, item, shot):
+        if shot is None:
+            return
+        catalog = self._catalog(shot["root"])
+        width, height, size = shot["info"] or (None, None, item.size)
+        parts = item.folder.split("/")
+        zone, character = parts[1:3] if len(parts) == 3 else (None, None)
+        with self._timed("catalog"):
+            catalog.record(item.target, parts[0], zone, character, width, height, size, shot["thumbnail"])
+
+    # ------ Duplicates ------
+    def _link_duplicate(self, i, item, pipeline, index, step="duplicate"):
+        """Hardlink the identical file into the item's place instead of writing its bytes again."""
+        shot = self._new_shot(item)
+
+        def link():
+            self._link(item.duplicate_of, item.target)
+            if item.archive is not None:
+                self._link(item.duplicate_of, item.archive)
+                # Its bytes now live in the sorted tree and Archive
+                self._remove_source(item.source, item.target, item.archive)
+            self._describe(shot, item.target)
+
+        def done():
+            self._catalog_record(item, shot)
+            self._finish_duplicate(i, item, index)
+
+        if step == "duplicate":
+            pipeline.write(link, done)
+        else:
+            self._finish_later(pipeline, shot, item.target, done)
+
+    def _remove_duplicate(self, i, item, pipeline, index):
+        """Delete a source whose bytes already sit in its own sorted folder or Archive."""
+        def remove():
+            # Only once the copy is really there (it may have been planned earlier in this run)
+            if os.path.exists(item.duplicate_of):
+                discard(item.source)
+
+        pipeline.write(remove, lambda: self._finish_duplicate(i, item, index))
+
+    def _finish_duplicate(self, i, item, index):
+        if index is not None:
+            # So the next run recognises the file without hashing it again
+            with self._timed("index"):
+                index.record(item.source, item.size, item.mtime_ns, item.digest, item.target or item.duplicate_of)
+        self._item_done(i, item, "duplicate")
+
+    # ------ Move & Archive ------
+    def _move_and_archive(self, i, item, pipeline, step="move"):
+        """Sort one file into ``date/location/character`` under its source root, keeping an Archive copy.
+
+        ``step`` is ``"move"`` for a fresh file; a resumed one may only need its
+        ``"render"`` (single pass), ``"archive"`` copy or ``"finish"``. The file
+        work runs on the pipeline's threads; ``done`` runs back here once the
+        sorted file and its archive copy both exist.
+        """
+        src, dest_path, archive_target = item.source, item.target, item.archive
+        nbytes = item.size if self.stats is not None else 0
+        shot = self._new_shot(item)
+
+        def done(error=None):
+            self._catalog_record(item, shot)
+            self._item_done(i, item, "moved")
+
+        if step == "finish":
+            self._finish_later(pipeline, shot, dest_path, done)
+            return
+
+        if self.settings.watermark is not None and self.settings.archive_originals:
+            # Single pass: the original is renamed into Archive untouched and the
+            # watermarked version is encoded once, straight to its sorted path.
+            def archive_original():
+                self._move(src, archive_target, nbytes)
+
+            def restore(error):
+                if error is None:
+                    shutil.copystat(archive_target, dest_path)
+                else:
+                    self._copy(archive_target, dest_path)  # keep the sorted tree complete
+                self._describe(shot, dest_path, rendered=error is None)
+
+            pipeline.submit(
+                archive_target, done, out_path=dest_path,
+                before=archive_original if step == "move" else None,
+                then=restore,
+                prefetch=src if step == "move" else archive_target,
+                thumbnail_path=shot["thumbnail"] if shot else None,
+            )
+            return
+
+        def archive():
+            # Runs once the sorted file is complete, so the archive gets the final file
+            self._copy(dest_path, archive_target, "archive", nbytes)
+
+        if step == "archive":
+            def archive_only():
+                archive()
+                self._describe(shot, dest_path)
+
+            pipeline.write(archive_only, done)
+        elif self.settings.watermark is not None:
+            # Encode from the original, which stays put until the sorted file and
+            # its archive copy both exist: a crash never leaves only a half-written file
+            def finish_watermark(error):
+                if error is None:
+                    shutil.copystat(src, dest_path)
+                    archive()
+                    self._remove_source(src, dest_path, archive_target)
+                else:
+                    self._move(src, dest_path, nbytes)
+                    archive()
+                self._describe(shot, dest_path, rendered=error is None)
+
+            pipeline.submit(
+                src, done, out_path=dest_path, then=finish_watermark, prefetch=src,
+                thumbnail_path=shot["thumbnail"] if shot else None,
+            )
+        else:
+            def move():
+                self._move(src, dest_path, nbytes)  # move original
+                archive()
+                self._describe(shot, dest_path)
+
+            pipeline.write(move, done, prefetch=self._prefetch(item))
+
+    # ------ Copy to destination ------
+    def _copy_to_destination(self, i, item, pipeline, index, step="copy"):
+        src, dest_file_path = item.source, item.target
+        shot = self._new_shot(item)
+
+        def done(error=None):
+            if index is not None:
+                # Record only once the file (and its watermark) is complete
+                with self._timed("index"):
+                    index.record(src, item.size, item.mtime_ns, item.digest, dest_file_path)
+            self._catalog_record(item, shot)
+            self._item_done(i, item, "copied")
+
+        if step == "finish":
+            self._finish_later(pipeline, shot, dest_file_path, done)
+        elif self.settings.watermark is not None:
+            def restore(error):
+                if error is None:
+                    shutil.copystat(src, dest_file_path)
+                else:
+                    self._copy(src, dest_file_path)  # fall back to the plain copy
+                self._describe(shot, dest_file_path, rendered=error is None)
+
+            # Encode the watermarked copy directly from the source: one write, no copy first
+            pipeline.submit(
+                src, done, out_path=dest_file_path, then=restore, prefetch=src,
+                thumbnail_path=shot["thumbnail"] if shot else None,
+            )
+        else:
+            def copy():
+                self._copy(src, dest_file_path, nbytes=item.size if self.stats is not None else 0)
+                self._describe(shot, dest_file_path)
+
+            pipeline.write(copy, done, prefetch=self._prefetch(item))
@@ -0,0 +1,99 @@
+"""Persistent index of processed files, so re-runs only touch new screenshots."""
+import hashlib
+import os
+import sqlite3
+import time
+
+INDEX_FILENAME = ".screenshot_sorter.sqlite"
+HASH_CHUNK = 1 << 20
+
+
+def file_hash(path, chunk_size=HASH_CHUNK):
+    """Streaming BLAKE2b digest (hex) of a file's contents."""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ProcessedIndex:
+    """SQLite table of ``source path → (size, mtime, hash, target)``.
+
+    A file whose path, size and mtime are already recorded is unchanged and is
+    recognised without reading it; otherwise its content hash is compared, so a
+    renamed or re-imported copy of a known screenshot is recognised as well.
+    Writes are committed in batches of ``commit_every`` records.
+    """
+
+    def __init__(self, path, commit_every=200):
+        self.path = path
+        self.commit_every = commit_every
+        self._uncommitted = 0
+        self._db = sqlite3.connect(path)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS processed (
+                source TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                target TEXT,
+                processed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS processed_hash ON processed(hash);
+            """
+        )
+
+    @classmethod
+    def for_folder(cls, folder, create=True):
+        """Open the index of ``folder``; with ``create=False``, ``None`` if there is none yet."""
+        path = os.path.join(folder, INDEX_FILENAME)
+        if not create and not os.path.exists(path):
+            return None
+        return cls(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    @staticmethod
+    def _key(source):
+        return os.path.normcase(os.path.abspath(source))
+
+    def is_unchanged(self, source, size, mtime_ns):
+        row = self._db.execute(
+            "SELECT size, mtime_ns FROM processed WHERE source = ?", (self._key(source),)
+        ).fetchone()
+        return row is not None and row[0] == size and row[1] == mtime_ns
+
+    def target_for_hash(self, digest):
+        """Target of a previously processed file with identical content, else ``None``."""
+        row = self._db.execute("SELECT target FROM processed WHERE hash = ? LIMIT 1", (digest,)).fetchone()
+        return row[0] if row else None
+
+    def record(self, source, size, mtime_ns, digest, target):
+        self._db.execute(
+            "INSERT OR REPLACE INTO processed (source, size, mtime_ns, hash, target, processed_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (self._key(source), size, mtime_ns, digest, target, time.time()),
+        )
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        self._db.commit()
+        self._uncommitted = 0
+
+    def close(self):
+        if self._db is not None:
+            self.commit()
+            self._db.close()
+            self._db = None
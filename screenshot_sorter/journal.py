@@ -0,0 +1,107 @@
+"""Write-ahead journal, so an interrupted run can be resumed where it stopped."""
+import json
+import os
+
+from .plan import PlannedFile, SortPlan
+from .transfer import discard, fsync_dir, partial_path
+
+JOURNAL_FILENAME = ".screenshot_sorter.journal"
+JOURNAL_VERSION = 1
+
+
+class Journal:
+    """Append-only JSON-lines log of one run: its settings, its plan, and each finished file.
+
+    :meth:`create` writes the header and the whole plan (in execution order, so
+    ``done`` indices match :meth:`SortPlan.in_execution_order`) and renames it
+    into place before any file is touched, so a journal on disk always holds a
+    complete plan. ``{"done": i}`` records are then appended as files finish; they are buffered and written + ``fsync``'d every ``sync_every``
+    files, after calling ``before_sync`` (the engine commits the index there,
+    so a durable ``done`` record never refers to an unrecorded copy). A file
+    finished after the last sync is simply checked again on resume.
+    """
+
+    def __init__(self, path, sync_every=200, before_sync=None):
+        self.path = path
+        self.sync_every = sync_every
+        self.before_sync = before_sync
+        self._done = []
+        self._file = None
+
+    @staticmethod
+    def path_for(folder):
+        return os.path.join(folder, JOURNAL_FILENAME)
+
+    @classmethod
+    def create(cls, path, header, plan, **kwargs):
+        tmp = partial_path(path)
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"version": JOURNAL_VERSION, "mode": plan.mode, **header}) + "\n")
+            for item in plan.in_execution_order():
+                f.write(json.dumps(_item_record(item), ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        fsync_dir(os.path.dirname(path))
+        return cls(path, **kwargs)
+
+    @staticmethod
+    def load(path):
+        """``(header, plan, done_indices)`` of the journal at ``path``.
+
+        Raises ``ValueError`` if it isn't a journal this version can resume.
+        """
+        header, items, done = None, [], set()
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # torn last line after a crash; everything before it is intact
+                if header is None:
+                    header = record
+                elif "done" in record:
+                    done.add(record["done"])
+                else:
+                    items.append(PlannedFile(**record))
+        if header is None or header.get("version") != JOURNAL_VERSION:
+            raise ValueError(f"Unsupported journal: {path}")
+        return header, SortPlan(header["mode"], items), done
+
+    def done(self, i):
+        self._done.append(i)
+        if len(self._done) >= self.sync_every:
+            self.sync()
+
+    def sync(self):
+        if not self._done:
+            return
+        if self.before_sync is not None:
+            self.before_sync()
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write("".join(f'{{"done": {i}}}\n' for i in self._done))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._done.clear()
+
+    def close(self, finished):
+        """Sync and close; a ``finished`` run's journal is deleted."""
+        if finished:
+            self._done.clear()
+        else:
+            self.sync()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if finished:
+            discard(self.path)
+
+
+def _item_record(item):
+    # Absolute paths, so a resume started from another working directory still finds the files
+    record = {name: getattr(item, name) for name in PlannedFile.__dataclass_fields__}
+    for name in ("source", "target", "archive", "duplicate_of"):
+        if record[name] is not None:
+            record[name] = os.path.abspath(record[name])
+    return {k: v for k, v in record.items() if v is not None}
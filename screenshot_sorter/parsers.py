@@ -0,0 +1,165 @@
+"""Screenshot filename parsers: which client or plugin wrote a file, and when.
+
+Each parser is one precompiled pattern with named groups ``year``, ``month``
+and ``day`` and, where the name carries them, ``location`` and ``character``.
+:class:`ParserChain` tries the registered parsers in turn, moving whichever
+matched to the front, so a folder full of one naming scheme costs a single
+regex per file.
+"""
+import email.utils
+import os
+import re
+import time
+from collections import Counter, namedtuple
+
+from PIL import Image
+
+# date_folder is "DD-MM-YYYY"; location/character are None when the name doesn't carry them
+ParsedName = namedtuple("ParsedName", "date_folder location character parser")
+
+_EXT = r"\.(?:png|jpe?g)$"
+
+
+class FilenameParser:
+    """One naming scheme: a name and a pattern, compiled once."""
+
+    __slots__ = ("name", "pattern", "_named")
+
+    def __init__(self, name, pattern, flags=re.IGNORECASE):
+        self.name = name
+        self.pattern = re.compile(pattern, flags)
+        self._named = "location" in self.pattern.groupindex
+
+    def parse(self, filename):
+        match = self.pattern.match(filename)
+        if match is None:
+            return None
+        date_folder = "-".join(match.group("day", "month", "year"))
+        if not self._named:
+            return ParsedName(date_folder, None, None, self.name)
+        location, character = match.group("location", "character")
+        location = location.strip()
+        character = character.strip()
+        if not location or not character:
+            return None
+        return ParsedName(date_folder, location, character, self.name)
+
+    def __repr__(self):
+        return f"FilenameParser({self.name!r}, {self.pattern.pattern!r})"
+
+
+PARSERS = [
+    # Sightseeingaway plugin: 2025-05-25_00-35-12.549-New Gridania-Char Name.png
+    FilenameParser(
+        "sightseeingaway",
+        r"^(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})_\d{2}-\d{2}-\d{2}\.\d{3}"
+        r"-(?P<location>.+)-(?P<character>[^-]+)" + _EXT,
+    ),
+    # Vanilla client: ffxiv_20250525_003512_549.png
+    FilenameParser("vanilla", r"^ffxiv_(?P<year>\d{4})(?P<month>\d{2})(?P<day>\d{2})_\d{6}(?:_\d{3})?" + _EXT),
+    # ReShade: ffxiv_dx11 2025-05-25 00-35-12.png
+    FilenameParser(
+        "reshade",
+        r"^ffxiv_dx11 (?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2}) \d{2}-\d{2}-\d{2}(?:\.\d+)?" + _EXT,
+    ),
+    # Steam overlay (app 39210): 39210_20250525003512_1.png
+    FilenameParser("steam", r"^39210_(?P<year>\d{4})(?P<month>\d{2})(?P<day>\d{2})\d{6}_\d+" + _EXT),
+]
+
+
+def register_parser(name, pattern, first=False):
+    """Add a naming scheme for every :class:`ParserChain` created afterwards.
+
+    ``pattern`` needs ``year``/``month``/``day`` groups, plus ``location`` and
+    ``character`` if the name carries them.
+    """
+    parser = FilenameParser(name, pattern)
+    if first:
+        PARSERS.insert(0, parser)
+    else:
+        PARSERS.append(parser)
+    return parser
+
+
+class ParserChain:
+    """Per-run parser: tries the registered parsers, most recently matched first.
+
+    ``hits`` counts matches per parser name (including the metadata fallback's
+    ``"exif"``, ``"png-text"`` and ``"mtime"``).
+    """
+
+    def __init__(self, parsers=None):
+        self._order = list(PARSERS if parsers is None else parsers)
+        self._last = self._order[0] if self._order else None
+        self.hits = Counter()
+
+    def parse(self, filename):
+        """:class:`ParsedName` for ``filename``, or ``None`` if no parser knows it."""
+        last = self._last
+        if last is not None:
+            parsed = last.parse(filename)
+            if parsed is not None:
+                self.hits[last.name] += 1
+                return parsed
+        order = self._order
+        for i, parser in enumerate(order):
+            if parser is last:
+                continue
+            parsed = parser.parse(filename)
+            if parsed is not None:
+                order.insert(0, order.pop(i))
+                self._last = parser
+                self.hits[parser.name] += 1
+                return parsed
+        return None
+
+    def date_taken(self, path, mtime=None):
+        """Fallback for names no parser knows: the date from the image's metadata, else its mtime."""
+        parsed = date_taken(path, mtime)
+        self.hits[parsed.parser] += 1
+        return parsed
+
+
+# EXIF DateTimeOriginal (in the Exif IFD) and DateTime; PNG text keys written by common tools
+_EXIF_IFD = 0x8769
+_EXIF_DATETIME_ORIGINAL = 0x9003
+_EXIF_DATETIME = 0x0132
+_PNG_DATE_KEYS = ("Creation Time", "date:create", "CreationDate")
+_DATE_RE = re.compile(r"(\d{4})[-:](\d{2})[-:](\d{2})")
+
+
+def _date_folder(text):
+    if not isinstance(text, str):
+        return None
+    match = _DATE_RE.search(text)
+    if match:
+        year, month, day = match.groups()
+        return f"{day}-{month}-{year}"
+    try:  # RFC 1123, as PNG's "Creation Time" recommends
+        return email.utils.parsedate_to_datetime(text).strftime("%d-%m-%Y")
+    except (TypeError, ValueError):
+        return None
+
+
+def date_taken(path, mtime=None):
+    """:class:`ParsedName` with only a date: EXIF, then PNG text chunks, then ``mtime``.
+
+    Only the header is read (no pixel decoding); PNG text stored after the
+    image data is not seen.
+    """
+    try:
+        with Image.open(path) as img:
+            exif = img.getexif()
+            value = exif.get_ifd(_EXIF_IFD).get(_EXIF_DATETIME_ORIGINAL) or exif.get(_EXIF_DATETIME)
+            date_folder = _date_folder(value)
+            if date_folder:
+                return ParsedName(date_folder, None, None, "exif")
+            for key in _PNG_DATE_KEYS:
+                date_folder = _date_folder(img.info.get(key))
+                if date_folder:
+                    return ParsedName(date_folder, None, None, "png-text")
+    except Exception:  # unreadable or not really an image: the mtime still says when it was taken
+        pass
+    if mtime is None:
+        mtime = os.stat(path).st_mtime
+    return ParsedName(time.strftime("%d-%m-%Y", time.localtime(mtime)), None, None, "mtime")
@@ -0,0 +1,223 @@
+"""Staged producer/consumer pipeline: read-ahead → CPU → writers, bounded and in order.
+
+The engine's thread is the producer: it queues one item per file and gets
+each item's ``on_done`` callback back on its own thread, strictly in
+submission order, so logging, the journal and the SQLite index never leave
+it. Meanwhile the stages of different files overlap: while one file is
+being encoded, the next ones are already being read ahead and earlier ones
+written out.
+
+* **read-ahead**: a background thread asks the OS to start reading the
+  source (``posix_fadvise(WILLNEED)`` where available, else a plain read into
+  the page cache), so a slow disk or NAS is already busy before the file is
+  needed.
+* **CPU**: ``cpu_task(*args)`` in a process pool (``cpu_workers > 1``) or on
+  one thread of its own.
+* **write**: plain callables on ``io_workers`` threads, for moves, copies and
+  archive copies; more than one helps on targets with high latency per file
+  (NAS, USB).
+
+At most ``max_in_flight`` items are queued at once; :meth:`Pipeline.submit`
+blocks the producer (delivering finished items) until there is room, so
+memory stays flat however large the run is. With ``profiles`` (a list),
+work on the pipeline's threads is profiled too: each thread appends its
+own ``cProfile.Profile``, enabled only while it runs a stage, for the
+caller to merge with the producer's profile. With ``io_workers=0`` and one
+CPU worker, everything runs inline on the producer's thread (a process pool
+always gets at least one writer thread, so writes never run on the pool's
+own result-handling thread).
+"""
+import cProfile
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+_READAHEAD_CHUNK = 1 << 20
+
+
+def readahead(path):
+    """Start reading ``path`` into the OS cache; a hint, so errors are ignored."""
+    try:
+        with open(path, "rb", buffering=0) as f:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+                return
+            while f.read(_READAHEAD_CHUNK):
+                pass
+    except OSError:
+        pass
+
+
+class Pipeline:
+    """Runs items through read-ahead, CPU and write stages; delivers results in order.
+
+    ``submit(on_done, before=None, args=None, then=None, prefetch=None)`` queues
+    one item: ``before()`` on a writer thread, then ``cpu_task(*args)``, then
+    ``then(result)`` on a writer thread (each stage optional, each starting
+    when the previous one finished). ``on_done(result)`` is called on the
+    producer's thread with the last stage's return value; an exception in any
+    stage is raised from there instead. ``prefetch`` is a path to read ahead.
+    ``write(func, on_done)`` is plain file work: ``func()`` on a writer thread,
+    then ``on_done()``. ``defer(on_done)`` queues a plain ``on_done()`` behind
+    everything submitted so far. With ``stats`` (a :class:`~.stats.StageStats`), the time
+    the producer spends waiting for results is recorded as :attr:`WAIT_STAGE`.
+    """
+
+    WAIT_STAGE = "pipeline.wait"
+
+    def __init__(self, cpu_task=None, cpu_workers=1, io_workers=1, max_in_flight=None, stats=None, profiles=None):
+        self.cpu_task = cpu_task
+        self.cpu_workers = max(1, cpu_workers)
+        self.io_workers = max(0 if self.cpu_workers == 1 else 1, io_workers)
+        self.max_in_flight = max_in_flight or 2 * (self.cpu_workers + max(1, self.io_workers))
+        self.stats = stats
+        self.profiles = profiles
+        self._thread_profile = threading.local()
+        self._cpu = None
+        self._io = None
+        self._reader = None
+        self._reading = deque()
+        self._pending = deque()
+
+    def __enter__(self):
+        if self.cpu_task is not None:
+            if self.cpu_workers > 1:
+                self._cpu = ProcessPoolExecutor(max_workers=self.cpu_workers)
+            elif self.io_workers:
+                self._cpu = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline-cpu")
+        if self.io_workers:
+            self._io = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="pipeline-io")
+            self._reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline-read")
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if exc[0] is None:
+                self.drain()
+        finally:
+            for executor in (self._reader, self._io, self._cpu):
+                if executor is not None:
+                    executor.shutdown(wait=True, cancel_futures=True)
+            self._cpu = self._io = self._reader = None
+            self._reading.clear()
+        return False
+
+    @property
+    def concurrent(self):
+        """True if stages run off the producer's thread (so items may finish out of order on disk)."""
+        return self._io is not None
+
+    def submit(self, on_done, before=None, args=None, then=None, prefetch=None):
+        steps = []
+        if before is not None:
+            steps.append((self._io, before, ()))
+        if args is not None:
+            steps.append((self._cpu, self.cpu_task, args))
+        if then is not None:
+            steps.append((self._io, then, None))
+        if not self.concurrent:
+            # Inline: nothing is ever pending, so delivering right away keeps the order
+            result = None
+            for _executor, func, func_args in steps:
+                result = func(*func_args) if func_args is not None else func(result)
+            self._deliver(result, on_done)
+            return
+        while len(self._pending) >= self.max_in_flight:
+            self._complete_oldest()
+        if prefetch is not None:
+            self._prefetch(prefetch)
+        future = Future()
+        self._advance(future, steps, None)
+        self._pending.append((future, on_done))
+
+    def write(self, func, on_done, prefetch=None):
+        """Run ``func()`` on a writer thread, then ``on_done()`` in order."""
+        Pipeline.submit(self, lambda _result: on_done(), before=func, prefetch=prefetch)
+
+    def defer(self, on_done):
+        """Run ``on_done`` once everything submitted before it has been delivered."""
+        if not self._pending:
+            on_done()
+            return
+        self._pending.append((None, on_done))
+
+    def drain(self):
+        """Deliver everything queued so far (a barrier: later items see its effects on disk)."""
+        while self._pending:
+            self._complete_oldest()
+
+    def _prefetch(self, path):
+        # Bounded too: a read-ahead backlog longer than the window would only evict itself
+        reading = self._reading
+        while reading and reading[0].done():
+            reading.popleft()
+        if self._reader is not None and len(reading) < self.max_in_flight:
+            reading.append(self._reader.submit(self._profiled(readahead), path))
+
+    def _advance(self, future, steps, result):
+        """Start the next stage of an item, or resolve its future after the last one."""
+        if not steps:
+            future.set_result(result)
+            return
+        executor, func, func_args = steps[0]
+        call_args = func_args if func_args is not None else (result,)
+        if not isinstance(executor, ProcessPoolExecutor):
+            func = self._profiled(func)
+        try:
+            stage = executor.submit(func, *call_args)
+        except BaseException as e:  # shut down while cancelling
+            future.set_exception(e)
+            return
+        stage.add_done_callback(lambda done: self._stage_done(future, steps, done))
+
+    def _profiled(self, func):
+        """``func``, profiled on whichever pipeline thread runs it (if ``profiles`` is set)."""
+        if self.profiles is None:
+            return func
+
+        def run(*args):
+            profiler = getattr(self._thread_profile, "profiler", None)
+            if profiler is None:
+                profiler = self._thread_profile.profiler = cProfile.Profile()
+                self.profiles.append(profiler)
+            profiler.enable()
+            try:
+                return func(*args)
+            finally:
+                profiler.disable()
+        return run
+
+    def _stage_done(self, future, steps, done):
+        try:
+            try:
+                result = done.result()
+            except Exception as e:
+                if steps[0][1] is not self.cpu_task:
+                    raise
+                result = self._cpu_failed(e)
+        except BaseException as e:
+            future.set_exception(e)
+            return
+        self._advance(future, steps[1:], result)
+
+    def _cpu_failed(self, error):
+        """Result to carry on with when the CPU stage itself failed (worker crashed, pool broken)."""
+        raise error
+
+    def _complete_oldest(self):
+        future, on_done = self._pending.popleft()
+        if future is None:
+            on_done()
+            return
+        start = time.perf_counter()
+        try:
+            result = future.result()
+        finally:
+            if self.stats is not None:
+                self.stats.add(self.WAIT_STAGE, time.perf_counter() - start)
+        self._deliver(result, on_done)
+
+    def _deliver(self, result, on_done):
+        on_done(result)
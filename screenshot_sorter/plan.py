@@ -0,0 +1,97 @@
+"""Sort plans: every file's fate decided up front, before anything on disk changes."""
+import json
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional
+
+ACTIONS = ("move", "copy", "duplicate", "unchanged", "skip")
+
+
+@dataclass
+class PlannedFile:
+    action: str  # one of ACTIONS
+    source: str
+    target: Optional[str] = None  # final sorted path (collision-resolved)
+    archive: Optional[str] = None  # archive mode: where the Archive copy goes
+    folder: Optional[str] = None  # "date/location/character"
+    reason: Optional[str] = None  # why a file is skipped
+    duplicate_of: Optional[str] = None  # same bytes as this (existing or earlier planned) file
+    size: Optional[int] = None
+    mtime_ns: Optional[int] = None  # copy mode with index: stat + hash for the index record
+    digest: Optional[str] = None
+    remove_source: bool = False  # duplicate already in its own sorted folder or Archive: only delete the source
+
+    def to_dict(self):
+        return {
+            "action": self.action,
+            "source": self.source,
+            "target": self.target,
+            "archive": self.archive,
+            "folder": self.folder,
+            "reason": self.reason,
+            "duplicate_of": self.duplicate_of,
+            "size": self.size,
+            "remove_source": self.remove_source,
+        }
+
+
+@dataclass
+class SortPlan:
+    """Ordered list of :class:`PlannedFile` for one run.
+
+    :meth:`in_execution_order` yields the work grouped by target directory, so
+    each folder is created once and written in one go (better disk locality
+    than scan order). Duplicates that get hardlinked (or whose source is
+    removed) come last, once the file they rely on is sure to exist.
+    """
+
+    mode: str
+    files: list = field(default_factory=list)
+
+    def add(self, planned):
+        self.files.append(planned)
+
+    def __len__(self):
+        return len(self.files)
+
+    def counts(self):
+        return dict(Counter(f.action for f in self.files))
+
+    def directories(self):
+        """Every folder the plan writes into, in first-use order."""
+        dirs = {}
+        for f in self.in_execution_order():
+            for path in (f.target, f.archive):
+                if path and f.action in ("move", "copy", "duplicate"):
+                    dirs.setdefault(os.path.dirname(path), None)
+        return list(dirs)
+
+    def in_execution_order(self):
+        # Items that need no disk work first, then one group per target folder
+        groups = {}
+        links = []
+        for f in self.files:
+            if f.action in ("move", "copy"):
+                groups.setdefault(os.path.dirname(f.target), []).append(f)
+            elif f.action == "duplicate" and (f.target or f.remove_source):
+                links.append(f)
+            else:
+                yield f
+        for items in groups.values():
+            yield from items
+        yield from links
+
+    def to_dict(self):
+        return {
+            "mode": self.mode,
+            "counts": self.counts(),
+            "bytes": sum(f.size or 0 for f in self.files if f.action in ("move", "copy")),
+            "duplicate_bytes": sum(f.size or 0 for f in self.files if f.action == "duplicate"),
+            "directories": self.directories(),
+            "files": [f.to_dict() for f in self.in_execution_order()],
+        }
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=1)
@@ -0,0 +1,158 @@
+"""Directory scanning and in-memory collision resolution for target folders."""
+import os
+import re
+from fnmatch import fnmatch
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg")
+ARCHIVE_DIRNAME = "Archive"
+THUMBNAIL_DIRNAME = ".thumbnails"  # catalog thumbnails, next to the sorted tree
+
+# Top level of a tree this tool already produced ("25-05-2025/Zone/Character")
+_SORTED_DATE_DIR_RE = re.compile(r"^\d{2}-\d{2}-\d{4}$")
+
+
+class ImageEntry:
+    """One image found by a scan. ``root`` is the source folder it was found under.
+
+    ``stat()`` is cached (``os.DirEntry``).
+    """
+
+    __slots__ = ("name", "path", "root", "_entry")
+
+    def __init__(self, entry, root=None):
+        self.name = entry.name
+        self.path = entry.path
+        self.root = root
+        self._entry = entry
+
+    @classmethod
+    def from_path(cls, path, root=None):
+        """Entry for a path known from elsewhere (e.g. a file-system event)."""
+        return cls(_PathEntry(path), root)
+
+    def stat(self):
+        return self._entry.stat()
+
+    def __repr__(self):
+        return f"ImageEntry({self.path!r})"
+
+
+class _PathEntry:
+    """The bits of ``os.DirEntry`` that :class:`ImageEntry` uses, for a bare path."""
+
+    __slots__ = ("name", "path", "_stat")
+
+    def __init__(self, path):
+        self.name = os.path.basename(path)
+        self.path = path
+        self._stat = None
+
+    def stat(self):
+        if self._stat is None:
+            self._stat = os.stat(self.path)
+        return self._stat
+
+
+def is_sorted_output_dir(name):
+    """True for folders this tool writes into: ``Archive``, ``DD-MM-YYYY`` date trees and thumbnails."""
+    return name in (ARCHIVE_DIRNAME, THUMBNAIL_DIRNAME) or bool(_SORTED_DATE_DIR_RE.match(name))
+
+
+def _matches(rel_path, patterns):
+    return any(fnmatch(rel_path, pat) or fnmatch(rel_path.rsplit("/", 1)[-1], pat) for pat in patterns)
+
+
+def is_wanted(rel_path, include=(), exclude=()):
+    """True if the image at ``rel_path`` (relative to its root, ``/``-separated) passes the filters."""
+    if include and not _matches(rel_path, include):
+        return False
+    return not (exclude and _matches(rel_path, exclude))
+
+
+def is_scanned_dir(rel_path, exclude=()):
+    """True if a recursive scan descends into the folder at ``rel_path``."""
+    return not is_sorted_output_dir(rel_path.rsplit("/", 1)[-1]) and not _matches(rel_path, exclude)
+
+
+def scan_sources(roots, recursive=False, include=(), exclude=(), skip_dirs=()):
+    """Yield images from every root in ``roots``, as one stream.
+
+    With ``recursive``, subfolders are walked too, except ``Archive``, already
+    sorted ``DD-MM-YYYY`` trees, catalog thumbnails and anything in
+    ``skip_dirs`` (e.g. a copy destination inside a source).
+    ``include``/``exclude`` are glob patterns matched against the path relative
+    to its root (``/``-separated) or the bare name; ``exclude`` also prunes
+    folders. A folder reachable from several roots is only scanned once.
+    """
+    seen = set()
+    skip = {os.path.normcase(os.path.abspath(d)) for d in skip_dirs if d}
+
+    for root in roots:
+        stack = [(root, "")]
+        while stack:
+            folder, rel_folder = stack.pop()
+            key = os.path.normcase(os.path.abspath(folder))
+            if key in seen or key in skip:
+                continue
+            seen.add(key)
+
+            subdirs = []
+            with os.scandir(folder) as it:
+                for entry in it:
+                    rel = f"{rel_folder}{entry.name}"
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive and is_scanned_dir(rel, exclude):
+                            subdirs.append((entry.path, rel + "/"))
+                        continue
+                    if not entry.name.lower().endswith(IMAGE_EXTS) or not entry.is_file():
+                        continue
+                    if not is_wanted(rel, include, exclude):
+                        continue
+                    yield ImageEntry(entry, root)
+            # Reverse so folders are visited in listing order
+            stack.extend(reversed(subdirs))
+
+
+class NameReserver:
+    """Hands out collision-free target paths (``name (1).ext``, …) per folder.
+
+    Each target folder is listed once, the first time it is used (a folder that
+    doesn't exist yet simply starts empty; nothing is created here). After that,
+    collisions are resolved against an in-memory name set instead of probing
+    the filesystem. Reserved names count as taken immediately, so two files in
+    one run can't be handed the same target.
+    """
+
+    def __init__(self):
+        self._taken = {}
+        self._next_suffix = {}
+
+    def _names(self, folder):
+        names = self._taken.get(folder)
+        if names is None:
+            try:
+                with os.scandir(folder) as it:
+                    names = {os.path.normcase(e.name) for e in it}
+            except FileNotFoundError:
+                names = set()
+            self._taken[folder] = names
+        return names
+
+    def reserve(self, folder, filename):
+        names = self._names(folder)
+        key = os.path.normcase(filename)
+        if key not in names:
+            names.add(key)
+            return os.path.join(folder, filename)
+
+        base, ext = os.path.splitext(filename)
+        suffix_key = (folder, os.path.normcase(base), ext.lower())
+        i = self._next_suffix.get(suffix_key, 1)
+        while True:
+            candidate = f"{base} ({i}){ext}"
+            i += 1
+            if os.path.normcase(candidate) not in names:
+                break
+        self._next_suffix[suffix_key] = i
+        names.add(os.path.normcase(candidate))
+        return os.path.join(folder, candidate)
@@ -0,0 +1,96 @@
+"""Opt-in per-stage timing: latency histograms and byte counts for a run."""
+import threading
+import time
+from contextlib import contextmanager
+
+_BUCKETS = 40  # log2 microsecond buckets: bucket i holds [2**(i-1), 2**i) µs
+
+
+class _Stage:
+    __slots__ = ("count", "total", "max", "bytes", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.bytes = 0
+        self.buckets = [0] * _BUCKETS
+
+    def add(self, seconds, nbytes):
+        self.count += 1
+        self.total += seconds
+        self.bytes += nbytes
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[min(int(seconds * 1e6).bit_length(), _BUCKETS - 1)] += 1
+
+    def percentile_ms(self, q):
+        """Upper edge of the bucket holding the q-th percentile (so within 2x of exact)."""
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min((1 << i) / 1000.0, self.max * 1000.0)
+        return self.max * 1000.0
+
+
+class StageStats:
+    """Collects latency samples per named stage (``"move"``, ``"wm.encode"``, …).
+
+    Memory is constant per stage: samples go into a fixed log2 histogram, so
+    percentiles are approximate. Samples may be recorded from the engine's
+    writer threads too (worker-process timings are merged in via :meth:`add`).
+    """
+
+    def __init__(self):
+        self._stages = {}
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+
+    def add(self, stage, seconds, nbytes=0):
+        with self._lock:
+            st = self._stages.get(stage)
+            if st is None:
+                st = self._stages[stage] = _Stage()
+            st.add(seconds, nbytes)
+
+    @contextmanager
+    def time(self, stage, nbytes=0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, nbytes)
+
+    def summary(self):
+        """JSON-friendly ``{stage: {count, total_s, mean_ms, p50_ms, p90_ms, p99_ms, max_ms, bytes, mb_per_s}}``."""
+        out = {}
+        for name, st in sorted(self._stages.items(), key=lambda kv: -kv[1].total):
+            out[name] = {
+                "count": st.count,
+                "total_s": round(st.total, 4),
+                "mean_ms": round(st.total / st.count * 1000.0, 3) if st.count else 0.0,
+                "p50_ms": round(st.percentile_ms(0.50), 3),
+                "p90_ms": round(st.percentile_ms(0.90), 3),
+                "p99_ms": round(st.percentile_ms(0.99), 3),
+                "max_ms": round(st.max * 1000.0, 3),
+                "bytes": st.bytes,
+                "mb_per_s": round(st.bytes / st.total / 1e6, 1) if st.bytes and st.total else None,
+            }
+        return out
+
+
+def format_profile(event):
+    """Text table for a ``profile`` event, one line per stage (slowest first)."""
+    lines = [f"Stage timings (wall {event['wall_s']:.2f} s)"]
+    lines.append(f"{'stage':<14}{'count':>8}{'total s':>10}{'mean ms':>10}{'p90 ms':>9}{'max ms':>9}{'MB/s':>8}")
+    for name, st in event["stages"].items():
+        mbps = f"{st['mb_per_s']:.1f}" if st["mb_per_s"] is not None else "-"
+        lines.append(
+            f"{name:<14}{st['count']:>8}{st['total_s']:>10.3f}{st['mean_ms']:>10.2f}"
+            f"{st['p90_ms']:>9.2f}{st['max_ms']:>9.2f}{mbps:>8}"
+        )
+    if event.get("profile_dump"):
+        lines.append(f"cProfile written to {event['profile_dump']}")
+    return lines
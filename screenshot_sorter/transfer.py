@@ -0,0 +1,203 @@
+"""File transfer strategies: pick the cheapest way to get bytes from A to B.
+
+On the same filesystem a "copy" can often be pure metadata work: a reflink
+(copy-on-write clone, btrfs/xfs via ``FICLONE``) or, if the user allows it, a
+hardlink. Otherwise the kernel-side ``copy_file_range``/``sendfile`` paths are
+used before falling back to a plain byte copy.
+
+Every copy is written to a hidden ``.name.part`` file next to the target,
+flushed to disk and renamed into place, so a target that exists is always
+complete, even after a power cut.
+"""
+import errno
+import os
+import shutil
+import sys
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+POLICIES = ("auto", "link", "copy")
+
+FICLONE = 0x40049409  # _IOW(0x94, 9, int) from linux/fs.h
+
+# errnos meaning "this filesystem pair can't do that", as opposed to a real I/O error
+_UNSUPPORTED = {errno.EXDEV, errno.EOPNOTSUPP, errno.EINVAL, errno.ENOTTY, errno.ENOSYS, errno.EPERM}
+if hasattr(errno, "ENOTSUP"):
+    _UNSUPPORTED.add(errno.ENOTSUP)
+
+
+def partial_path(path):
+    """Hidden sibling that ``path`` is written to before being renamed into place."""
+    folder, name = os.path.split(path)
+    return os.path.join(folder, f".{name}.part")
+
+
+def discard(path):
+    """Remove ``path`` if it exists (e.g. a ``.part`` file left by a crash)."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def fsync_file(path):
+    """Flush ``path``'s data to disk (best effort: some platforms only sync handles open for writing)."""
+    for flags in (os.O_RDONLY, os.O_RDWR):
+        try:
+            fd = os.open(path, flags)
+        except OSError:
+            continue
+        try:
+            os.fsync(fd)
+            return
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+def fsync_dir(folder):
+    """Make renames inside ``folder`` durable (no-op where directories can't be opened)."""
+    try:
+        fd = os.open(folder or ".", os.O_RDONLY)
+    except OSError:  # Windows
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class Transfer:
+    """Copies and moves files according to a policy.
+
+    * ``"auto"``: reflink if the filesystem supports it, else a kernel-side copy.
+      The result is always an independent file.
+    * ``"link"``: hardlink when source and target share a filesystem (the two
+      names then share their bytes), else as ``"auto"``.
+    * ``"copy"``: always a plain ``shutil.copy2``.
+
+    Each method returns how the file was transferred (``"reflink"``,
+    ``"hardlink"``, ``"rename"``, ``"copy"``), which the engine reports per file.
+    Filesystem pairs that refuse a fast path are remembered, so it is only tried once.
+    """
+
+    def __init__(self, policy="auto"):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown transfer policy {policy!r} (expected one of {', '.join(POLICIES)}).")
+        self.policy = policy
+        self._dev_cache = {}
+        self._unsupported = set()  # (method, src_dev, dst_dev)
+
+    def _dev(self, folder):
+        dev = self._dev_cache.get(folder)
+        if dev is None:
+            dev = os.stat(folder).st_dev
+            self._dev_cache[folder] = dev
+        return dev
+
+    def same_filesystem(self, src, dst):
+        return self._dev(os.path.dirname(src) or ".") == self._dev(os.path.dirname(dst) or ".")
+
+    def _try(self, method, src, dst, func):
+        key = (method, self._dev(os.path.dirname(src) or "."), self._dev(os.path.dirname(dst) or "."))
+        if key in self._unsupported:
+            return False
+        try:
+            func(src, dst)
+            return True
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED:
+                raise
+            self._unsupported.add(key)
+            try:
+                os.unlink(dst)  # a failed clone may leave an empty file behind
+            except OSError:
+                pass
+            return False
+
+    def copy(self, src, dst):
+        """Copy ``src`` to ``dst`` with its metadata, like ``copy2``; ``dst`` appears atomically.
+
+        The copy is flushed to disk before the rename, so callers may delete
+        the source once ``dst`` exists.
+        """
+        tmp = partial_path(dst)
+        discard(tmp)
+        how = self._copy(src, tmp)
+        if how != "hardlink":  # a second name for bytes already on disk
+            fsync_file(tmp)
+        os.replace(tmp, dst)
+        return how
+
+    def _copy(self, src, dst):
+        if self.policy == "copy":
+            shutil.copy2(src, dst)
+            return "copy"
+        if self.policy == "link" and self.same_filesystem(src, dst):
+            if self._try("hardlink", src, dst, os.link):
+                return "hardlink"
+        if fcntl is not None and sys.platform.startswith("linux"):
+            if self._try("reflink", src, dst, _reflink):
+                shutil.copystat(src, dst)
+                return "reflink"
+        _kernel_copy(src, dst)
+        shutil.copystat(src, dst)
+        return "copy"
+
+    def link(self, src, dst):
+        """Hardlink ``dst`` to ``src`` whatever the policy (for identical content); a copy where impossible."""
+        tmp = partial_path(dst)
+        discard(tmp)
+        if self.same_filesystem(src, dst) and self._try("hardlink", src, tmp, os.link):
+            os.replace(tmp, dst)
+            return "hardlink"
+        return self.copy(src, dst)
+
+    def move(self, src, dst):
+        """Move ``src`` to ``dst``: a rename on the same filesystem, copy + delete otherwise.
+
+        Either way ``dst`` is complete, and on disk, before ``src`` disappears.
+        """
+        if self.same_filesystem(src, dst):
+            os.replace(src, dst)
+            return "rename"
+        how = self.copy(src, dst)
+        fsync_dir(os.path.dirname(dst))
+        os.unlink(src)
+        return how
+
+
+def _reflink(src, dst):
+    with open(src, "rb") as fsrc, open(dst, "xb") as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+
+
+def _kernel_copy(src, dst):
+    """Byte copy that stays in the kernel where possible.
+
+    ``copy_file_range`` lets NFS/SMB servers copy server-side and some local
+    filesystems share extents; ``shutil.copyfile`` already uses
+    ``sendfile``/``fcopyfile``/``CopyFile2`` on the platforms that have them.
+    """
+    if hasattr(os, "copy_file_range"):
+        with open(src, "rb") as fsrc, open(dst, "xb") as fdst:
+            try:
+                size = os.fstat(fsrc.fileno()).st_size
+                offset = 0
+                while offset < size:
+                    n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - offset, offset, offset)
+                    if n == 0:
+                        break
+                    offset += n
+                return
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED:
+                    raise
+        os.unlink(dst)
+    shutil.copyfile(src, dst)
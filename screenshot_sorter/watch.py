@@ -0,0 +1,440 @@
+"""Watch mode: keep sorting new screenshots as they arrive, for as long as it runs.
+
+New files are noticed through inotify on Linux and by polling elsewhere (or
+with ``polling=True``, for network shares whose changes inotify never sees).
+A file is only sorted once its size and mtime have stayed the same for
+``settle`` seconds, so a screenshot the game is still writing is left
+alone. Settled files are sorted as one batch, by a fresh
+:class:`~.engine.SortEngine` run over just those files, with the same
+settings and rules as a normal run; a batch waits at most another
+``settle`` seconds for files that are still changing, so files that arrive
+together go together but nothing can hold the others back for long. Empty
+files are given up on after :data:`EMPTY_FILE_TIMEOUT` seconds. The files
+already there when watching starts (or after inotify lost events) settle
+the same way. A file stays queued until a run has sorted it: after a
+failed batch (a locked file, say), its files are retried one at a time,
+less and less often, up to every :data:`RETRY_DELAY_MAX` seconds.
+
+Idle, the inotify watcher sleeps in ``select`` until the kernel reports a
+change; the polling watcher wakes every ``poll_interval`` seconds and only
+lists folders whose mtime changed. Little is kept between batches: the
+files still settling, the names in the watched folders when polling and,
+with dedupe, one :class:`~.dedupe.ContentIndex` of the output that each
+batch adds its files to instead of every batch listing the whole tree
+again.
+"""
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from dataclasses import replace
+
+from .engine import SortEngine, SortError
+from .scan import IMAGE_EXTS, ImageEntry, is_scanned_dir, is_wanted, scan_sources
+
+try:
+    import ctypes
+
+    _libc = ctypes.CDLL(None, use_errno=True) if sys.platform.startswith("linux") else None
+    if _libc is not None and not hasattr(_libc, "inotify_init1"):
+        _libc = None
+except (ImportError, OSError):
+    _libc = None
+
+# From linux/inotify.h
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_ONLYDIR
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; then len bytes of NUL-padded name
+
+# Folder mtimes this close to a listing may hide a later change on coarse filesystems
+_RACY_NS = 2_000_000_000
+
+# An empty file this old was abandoned (or the write failed): stop waiting for it
+EMPTY_FILE_TIMEOUT = 60.0
+
+# A file whose batch failed is retried after 2, 4, 8... settle periods, but at least this often
+RETRY_DELAY_MAX = 60.0
+
+
+def inotify_available():
+    return _libc is not None
+
+
+class _Tree:
+    """The folders being watched under each source root, honouring the scan filters."""
+
+    def __init__(self, roots, recursive=False, include=(), exclude=(), skip_dirs=()):
+        self.roots = list(roots)
+        self.recursive = recursive
+        self.include = include
+        self.exclude = exclude
+        self._skip = {os.path.normcase(os.path.abspath(d)) for d in skip_dirs if d}
+
+    def wants_file(self, rel, name):
+        return (
+            name.lower().endswith(IMAGE_EXTS)
+            and not name.startswith(".")
+            and is_wanted(rel, self.include, self.exclude)
+        )
+
+    def wants_dir(self, rel, path):
+        return (
+            self.recursive
+            and is_scanned_dir(rel, self.exclude)
+            and os.path.normcase(os.path.abspath(path)) not in self._skip
+        )
+
+    def list(self, folder, rel_folder):
+        """``(images, subfolders)`` directly in ``folder``: ``[(path, rel)]`` each."""
+        images, subdirs = [], []
+        try:
+            with os.scandir(folder) as it:
+                for entry in it:
+                    rel = f"{rel_folder}{entry.name}"
+                    if entry.is_dir(follow_symlinks=False):
+                        if self.wants_dir(rel, entry.path):
+                            subdirs.append((entry.path, rel + "/"))
+                    elif self.wants_file(rel, entry.name) and entry.is_file():
+                        images.append((entry.path, rel))
+        except (FileNotFoundError, NotADirectoryError):
+            pass
+        return images, subdirs
+
+
+class _InotifyBackend:
+    """One inotify watch per folder; blocks in ``select`` until something happens."""
+
+    name = "inotify"
+
+    def __init__(self, tree):
+        self.tree = tree
+        self._fd = _libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._wake_r, self._wake_w = os.pipe()
+        self._watches = {}  # wd -> (root, folder, rel_folder)
+        for root in tree.roots:
+            self._add(root, root, "")
+
+    def _add(self, root, folder, rel_folder):
+        """Watch ``folder`` (and, recursively, its subfolders); returns the images already in them."""
+        wd = _libc.inotify_add_watch(self._fd, os.fsencode(folder), _WATCH_MASK)
+        if wd < 0:
+            return []  # vanished, or the watch limit is reached; new files there are picked up by the next full run
+        self._watches[wd] = (root, folder, rel_folder)
+        images, subdirs = self.tree.list(folder, rel_folder)
+        found = [(root, path) for path, _rel in images]
+        for path, rel in subdirs:
+            found += self._add(root, path, rel)
+        return found
+
+    def wait(self, timeout):
+        """``(candidates, overflowed)``: ``[(root, path)]`` of images that appeared or were written."""
+        ready, _, _ = select.select([self._fd, self._wake_r], [], [], timeout)
+        if self._wake_r in ready:
+            os.read(self._wake_r, 512)
+        if self._fd not in ready:
+            return [], False
+        found, overflowed = [], False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+                name = os.fsdecode(data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0"))
+                offset += _EVENT.size + length
+                if mask & _IN_Q_OVERFLOW:
+                    overflowed = True
+                    continue
+                if mask & _IN_IGNORED:
+                    self._watches.pop(wd, None)  # folder deleted or moved away
+                    continue
+                watch = self._watches.get(wd)
+                if watch is None or not name:
+                    continue
+                root, folder, rel_folder = watch
+                path, rel = os.path.join(folder, name), f"{rel_folder}{name}"
+                if mask & _IN_ISDIR:
+                    if self.tree.wants_dir(rel, path):
+                        found += self._add(root, path, rel + "/")
+                elif self.tree.wants_file(rel, name):
+                    found.append((root, path))
+        return found, overflowed
+
+    def forget(self, path):
+        pass  # inotify reports the file again if it is ever written
+
+    def wake(self):
+        os.write(self._wake_w, b"\0")
+
+    def close(self):
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            os.close(fd)
+
+
+class _PollingBackend:
+    """Re-lists a folder only when its mtime changed; otherwise one ``stat`` per folder per poll."""
+
+    name = "polling"
+
+    def __init__(self, tree, interval):
+        self.tree = tree
+        self.interval = interval
+        self._wake = threading.Event()
+        self._folders = {}  # folder -> [root, rel_folder, mtime_ns, listed_ns, names]
+        for root in tree.roots:
+            self._add(root, root, "")
+
+    def _add(self, root, folder, rel_folder):
+        record = self._folders[folder] = [root, rel_folder, None, 0, set()]
+        return self._relist(folder, record)
+
+    def _relist(self, folder, record):
+        root, rel_folder, _mtime, _listed, names = record
+        try:
+            record[2] = os.stat(folder).st_mtime_ns
+        except FileNotFoundError:
+            del self._folders[folder]
+            return []
+        record[3] = time.time_ns()
+        images, subdirs = self.tree.list(folder, rel_folder)
+        current = {path for path, _rel in images}
+        found = [(root, path) for path in current - names]
+        record[4] = current
+        for path, rel in subdirs:
+            if path not in self._folders:
+                found += self._add(root, path, rel)
+        return found
+
+    def wait(self, timeout):
+        self._wake.wait(self.interval if timeout is None else min(timeout, self.interval))
+        self._wake.clear()
+        found = []
+        for folder, record in list(self._folders.items()):
+            try:
+                mtime = os.stat(folder).st_mtime_ns
+            except FileNotFoundError:
+                del self._folders[folder]
+                continue
+            if mtime != record[2] or mtime >= record[3] - _RACY_NS:
+                found += self._relist(folder, record)
+        return found, False
+
+    def forget(self, path):
+        """Report ``path`` again at the next change in its folder (if it is still there)."""
+        record = self._folders.get(os.path.dirname(path))
+        if record is not None:
+            record[4].discard(path)
+
+    def wake(self):
+        self._wake.set()
+
+    def close(self):
+        self._folders.clear()
+
+
+class FolderWatcher:
+    """Sorts screenshots arriving in the source folder(s) until :meth:`stop` is called.
+
+    ``run()`` first resumes an interrupted run, if there is one, and queues
+    whatever is already there, then blocks, emitting the engine's events for
+    every batch plus ``{"event": "watch", "state": "watching"|"stopped",
+    "backend", "sources"}``. A batch that fails is reported as ``{"event":
+    "error", "error"}`` and watching goes on; its journal is resumed before the
+    next batch and its files are retried. ``stop()`` is thread- and
+    signal-safe and cancels a running batch between files.
+    """
+
+    def __init__(self, settings, emit=None, settle=2.0, poll_interval=5.0, max_batch=500, polling=False):
+        self.settings = settings
+        self.emit = emit or (lambda event: None)
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.max_batch = max_batch
+        self.polling = polling or not inotify_available()
+        # path -> [root, (size, mtime_ns) or None, monotonic time it last changed (or failed), failures]
+        self._pending = {}
+        self._wake_at = None  # monotonic time a pending file next needs a look
+        self._content = None  # dedupe: the output's ContentIndex, kept across batches
+        self._stop_evt = threading.Event()
+        self._backend = None
+        self._engine = None
+
+    def validate(self):
+        s = self.settings
+        if s.dry_run or s.resume or s.restart:
+            raise SortError("Watch mode can't be combined with a dry run, --resume or --restart "
+                            "(an interrupted run is resumed automatically).")
+        if s.mode == "copy" and not s.incremental:
+            raise SortError("Watch mode needs the destination's index in copy mode (drop --no-index).")
+        SortEngine(replace(s, restart=True)).validate()
+
+    def stop(self):
+        self._stop_evt.set()
+        engine, backend = self._engine, self._backend
+        if engine is not None:
+            engine.cancel()
+        if backend is not None:
+            backend.wake()
+
+    def run(self):
+        self.validate()
+        s = self.settings
+        tree = _Tree(s.sources, s.recursive, s.include, s.exclude, [s.dest] if s.mode == "copy" else [])
+        # Watch before catching up, so nothing written in between is missed
+        self._backend = _PollingBackend(tree, self.poll_interval) if self.polling else _InotifyBackend(tree)
+        try:
+            self.emit({"event": "watch", "state": "watching", "backend": self._backend.name, "sources": s.sources})
+            self._resume()
+            self._rescan()
+            while not self._stop_evt.is_set():
+                self._flush()
+                found, overflowed = self._backend.wait(self._timeout())
+                for root, path in found:
+                    self._pending.setdefault(path, [root, None, 0.0, 0])
+                if overflowed:
+                    self._rescan()  # events were lost: a full listing finds whatever they were about
+        finally:
+            self._backend.close()
+            self._backend = None
+            self.emit({"event": "watch", "state": "stopped"})
+
+    def _timeout(self):
+        """Seconds until a pending file needs another look; ``None`` (sleep until woken) if none does."""
+        if self._wake_at is None:
+            return None
+        return max(0.05, self._wake_at - time.monotonic())
+
+    def _rescan(self):
+        """Queue every image in the source folders, as a full run would find them."""
+        s = self.settings
+        try:
+            for entry in scan_sources(s.sources, recursive=s.recursive, include=s.include, exclude=s.exclude,
+                                      skip_dirs=[s.dest] if s.mode == "copy" else []):
+                self._pending.setdefault(entry.path, [entry.root, None, 0.0, 0])
+        except OSError as e:
+            self.emit({"event": "error", "error": str(e)})
+
+    def _flush(self):
+        """Sort the files that have settled.
+
+        While other files are still changing, settled ones wait for them (so a
+        burst stays one batch), but never longer than another ``settle``
+        seconds, and only up to ``max_batch`` files. Files from a failed batch
+        are left out until their retry is due, then sorted one by one.
+        """
+        now = time.monotonic()
+        settle = self.settle
+        ready, busy, wake_at = [], False, []
+        for path, record in list(self._pending.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self._pending[path]  # sorted by a full run, or deleted
+                continue
+            signature = (st.st_size, st.st_mtime_ns)
+            if signature != record[1]:
+                record[1], record[2] = signature, now
+            age = now - record[2]
+            if record[3]:
+                delay = self._retry_delay(record[3])
+                if age < delay:
+                    wake_at.append(record[2] + delay)  # failed before: not holding anything up
+                    continue
+            if age < settle:
+                busy = True
+                wake_at.append(record[2] + settle)
+            elif not st.st_size:
+                # Nothing written yet: keep an eye on it for a while, without holding anything up
+                if age >= EMPTY_FILE_TIMEOUT:
+                    del self._pending[path]
+                    self._backend.forget(path)
+                else:
+                    wake_at.append(record[2] + EMPTY_FILE_TIMEOUT)
+            else:
+                ready.append(path)
+        if ready:
+            overdue = now - min(self._pending[path][2] for path in ready) >= 2 * settle
+            # A file that failed before goes alone, so it can't fail others with it again
+            retries = [path for path in ready if self._pending[path][3]]
+            if retries:
+                batch = retries[:1]
+                ready.remove(batch[0])
+            elif not busy or overdue or len(ready) >= self.max_batch:
+                batch, ready = ready[:self.max_batch], ready[self.max_batch:]
+            else:
+                batch = []
+            # The rest goes once it is overdue (or right away, if a batch left some behind)
+            wake_at += [self._pending[path][2] + 2 * settle for path in ready]
+            self._wake_at = min(wake_at) if wake_at else None
+            if batch:
+                self._sort_batch(batch)
+            return
+        self._wake_at = min(wake_at) if wake_at else None
+
+    def _sort_batch(self, batch):
+        """Sort the pending files ``batch``; they stay queued, for a retry, unless the run completes."""
+        entries = [ImageEntry.from_path(path, self._pending[path][0]) for path in batch]
+        completed = self._sort(entries)
+        now = time.monotonic()
+        for path in batch:
+            if completed:
+                del self._pending[path]
+            else:
+                record = self._pending[path]
+                record[2] = now
+                record[3] += 1
+                retry_at = now + self._retry_delay(record[3])
+                self._wake_at = retry_at if self._wake_at is None else min(self._wake_at, retry_at)
+
+    def _retry_delay(self, failures):
+        return min(self.settle * 2 ** failures, RETRY_DELAY_MAX)
+
+    def _resume(self):
+        """Finish an interrupted run, if there is one."""
+        engine = SortEngine(replace(self.settings, resume=True), self.emit)
+        if engine.interrupted_run():
+            self._content = None  # the resumed files aren't in it: list the output again
+            self._run_engine(engine)
+
+    def _sort(self, entries):
+        """One engine run over ``entries``, after finishing an interrupted run; ``True`` if it completed."""
+        self._resume()
+        if self._stop_evt.is_set():
+            return False
+        # The resumed run may have sorted some of them already
+        entries = [entry for entry in entries if os.path.exists(entry.path)]
+        if not entries:
+            return True
+        engine = SortEngine(self.settings, self.emit)
+        engine.content = self._content
+        summary = self._run_engine(engine, entries)
+        # Only a finished run leaves the index matching what is on disk
+        completed = summary is not None and summary["status"] == "completed"
+        self._content = engine.content if completed else None
+        return completed
+
+    def _run_engine(self, engine, entries=None):
+        """``engine.run(entries)``; its summary, or ``None`` if it failed (reported as an error event)."""
+        self._engine = engine
+        try:
+            if not self._stop_evt.is_set():
+                return engine.run(entries)
+        except (SortError, OSError) as e:
+            self.emit({"event": "error", "error": str(e)})
+        finally:
+            self._engine = None
+        return None
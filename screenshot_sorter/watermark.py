@@ -0,0 +1,215 @@
+"""Watermark rendering: cached overlay preparation, compositing and a process pool."""
+import os
+import time
+from functools import lru_cache
+
+from PIL import Image
+
+from .catalog import save_thumbnail
+from .pipeline import Pipeline
+from .transfer import discard, partial_path
+
+POSITIONS = ("top-left", "top-right", "bottom-left", "bottom-right")
+
+WATERMARK_CACHE_SIZE = 16
+
+# Base modes composited as-is; anything else (palette, CMYK, 16-bit…) is converted first
+_NATIVE_MODES = ("RGB", "RGBA", "L")
+
+
+@lru_cache(maxsize=WATERMARK_CACHE_SIZE)
+def _prepare_watermark(wm_path, wm_mtime_ns, wm_size, base_width, opacity):
+    """Load, trim, scale and fade the watermark for one base width.
+
+    ``wm_mtime_ns``/``wm_size`` are only part of the cache key, so editing the
+    watermark file between runs invalidates the entry. Callers must treat the
+    returned image as read-only since it is shared.
+    """
+    wm = Image.open(wm_path).convert("RGBA")
+
+    # Trim transparent padding so it truly hugs the corner
+    bbox = wm.getbbox()
+    if bbox:
+        wm = wm.crop(bbox)
+
+    # Resize watermark to ~30% of base width (visible but not huge)
+    scale = max(1, base_width // 3)
+    ratio = wm.height / wm.width if wm.width else 1
+    wm = wm.resize((scale, max(1, int(scale * ratio))), Image.LANCZOS)
+
+    # Opacity
+    alpha = wm.getchannel("A")
+    alpha = alpha.point([int(p * opacity) for p in range(256)])
+    wm.putalpha(alpha)
+    return wm
+
+
+@lru_cache(maxsize=WATERMARK_CACHE_SIZE)
+def _overlay_for_mode(wm_path, wm_mtime_ns, wm_size, base_width, opacity, mode):
+    """``(overlay, mask)`` ready to ``paste`` onto a base image of ``mode``.
+
+    The overlay is converted to the base's mode once here, so compositing never
+    has to convert the (much larger) base image.
+    """
+    wm = _prepare_watermark(wm_path, wm_mtime_ns, wm_size, base_width, opacity)
+    if mode == "RGBA":
+        return wm, wm
+    return wm.convert(mode), wm.getchannel("A")
+
+
+def prepared_watermark(wm_path, base_width, opacity, mode="RGBA"):
+    """Return the cached ``(overlay, mask)`` for ``base_width``/``mode``, rebuilt if the file changed."""
+    st = os.stat(wm_path)
+    return _overlay_for_mode(wm_path, st.st_mtime_ns, st.st_size, base_width, opacity, mode)
+
+
+def render_watermark(filepath, wm_path, position, opacity, out_path=None, timings=None, thumbnail_path=None):
+    """Composite ``wm_path`` onto ``filepath`` and save to ``out_path`` (default: in place).
+
+    Writing to a separate ``out_path`` lets callers encode straight to the final
+    location instead of copying first. The image is encoded to a ``.part`` file,
+    flushed to disk and renamed over ``out_path``, so a crash never leaves a
+    half-written screenshot behind. With ``thumbnail_path``, the catalog
+    thumbnail is made from the decoded image too, instead of decoding it again.
+    If ``timings`` is a dict, the seconds spent in each step (``wm.decode``,
+    ``wm.prepare``, ``wm.composite``, ``wm.thumbnail``, ``wm.encode``) are
+    stored in it. Module-level so it can run in a worker process.
+    """
+    out_path = out_path or filepath
+    clock = time.perf_counter if timings is not None else None
+    t0 = clock() if clock else 0.0
+
+    base = Image.open(filepath)
+    base.load()
+    if base.mode not in _NATIVE_MODES:
+        has_alpha = "A" in base.getbands() or "transparency" in base.info
+        base = base.convert("RGBA" if has_alpha else "RGB")
+    if clock:
+        t1 = clock()
+        timings["wm.decode"] = t1 - t0
+    wm, mask = prepared_watermark(wm_path, base.width, opacity, base.mode)
+    if clock:
+        t2 = clock()
+        timings["wm.prepare"] = t2 - t1
+
+    # Position
+    margin = 10
+    if position == "top-left":
+        xy = (margin, margin)
+    elif position == "top-right":
+        xy = (base.width - wm.width - margin, margin)
+    elif position == "bottom-left":
+        xy = (margin, base.height - wm.height - margin)
+    else:  # bottom-right
+        xy = (base.width - wm.width - margin, base.height - wm.height - margin)
+
+    # Blends in C, and only inside the overlay's box; the rest of the frame is untouched
+    base.paste(wm, xy, mask)
+    if clock:
+        t3 = clock()
+        timings["wm.composite"] = t3 - t2
+    if thumbnail_path is not None:
+        try:
+            save_thumbnail(base, thumbnail_path)
+        except OSError:
+            pass  # only a cache: the engine makes it from the output file instead
+        if clock:
+            t4 = clock()
+            timings["wm.thumbnail"] = t4 - t3
+            t3 = t4
+
+    # Save preserving original format
+    ext = os.path.splitext(out_path)[1].lower()
+    fmt = Image.registered_extensions().get(ext)
+    params = {}
+    if ext in (".jpg", ".jpeg"):
+        if base.mode not in ("RGB", "L"):
+            base = base.convert("RGB")
+        params["quality"] = 95
+    tmp = partial_path(out_path)
+    try:
+        with open(tmp, "wb") as f:
+            base.save(f, fmt, **params)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, out_path)
+    except BaseException:
+        discard(tmp)
+        raise
+    if clock:
+        timings["wm.encode"] = clock() - t3
+
+
+def _render_watermark_task(filepath, wm_path, position, opacity, out_path=None, timed=False, thumbnail_path=None):
+    """Process-pool wrapper: returns ``(error, timings)`` instead of raising."""
+    timings = {} if timed else None
+    try:
+        render_watermark(filepath, wm_path, position, opacity, out_path, timings, thumbnail_path)
+        return None, timings
+    except Exception as e:
+        return str(e), timings
+
+
+class WatermarkPool(Pipeline):
+    """Watermark files serially or across a process pool, as a :class:`~.pipeline.Pipeline`.
+
+    ``submit(filepath, on_done, out_path=None, before=None, then=None,
+    prefetch=None, thumbnail_path=None)`` queues a file; ``on_done(error)`` is
+    called after its watermark is written (``error`` is ``None`` or a message),
+    behind ``then(error)`` if given, which runs on a writer thread (e.g. to
+    archive the result). ``write`` and ``defer`` are the plain
+    :class:`~.pipeline.Pipeline` ones. Results are
+    delivered strictly in submission order (so the log stays deterministic).
+    With ``stats`` (a :class:`~.stats.StageStats`), the per-step render
+    timings and the time spent waiting on workers are recorded.
+    """
+
+    def __init__(self, wm_path, position, opacity, workers=1, on_result=None, stats=None, io_workers=0,
+                 profiles=None):
+        super().__init__(
+            _render_watermark_task,
+            cpu_workers=workers,
+            io_workers=io_workers,
+            stats=stats,
+            profiles=profiles,
+        )
+        self.args = (wm_path, position, opacity)
+        self.workers = self.cpu_workers
+        self.on_result = on_result
+
+    def submit(self, filepath, on_done, out_path=None, before=None, then=None, prefetch=None, thumbnail_path=None):
+        out_path = out_path or filepath
+
+        def finish(result):
+            then(result[0])
+            return result
+
+        super().submit(
+            lambda result: self._delivered(out_path, result, on_done),
+            before=before,
+            args=(filepath, *self.args, out_path, self.stats is not None, thumbnail_path),
+            then=finish if then is not None else None,
+            prefetch=prefetch,
+        )
+
+    def _cpu_failed(self, error):
+        return str(error) or error.__class__.__name__, None
+
+    def _delivered(self, filepath, result, on_done):
+        error, timings = result
+        if timings and self.stats is not None:
+            for stage, seconds in timings.items():
+                self.stats.add(stage, seconds)
+        if self.on_result is not None:
+            self.on_result(filepath, error)
+        on_done(error)
+
+
+def opacity_from_percent(value, default=70.0):
+    """Parse an opacity percentage and clamp it to [0.05, 1.0]."""
+    try:
+        pct = float(str(value).strip())
+    except Exception:
+        pct = default
+    pct = max(5.0, min(100.0, pct))  # clamp 5–100%
+    return pct / 100.0
@@ -1,13 +1,19 @@
+import multiprocessing
 import os
-import re
-import shutil
+import queue
+import threading
+import time
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext
 
 import ttkbootstrap as tb
 from ttkbootstrap.constants import *
 
-from PIL import Image
+from screenshot_sorter import SortEngine, SortError, SortSettings, WatermarkSettings, format_event
+from screenshot_sorter.dedupe import DEDUPE_MODES
+from screenshot_sorter.stats import format_profile
+from screenshot_sorter.transfer import POLICIES as TRANSFER_POLICIES
+from screenshot_sorter.watermark import opacity_from_percent
 
 # ------------------------ Tooltip helper ------------------------
 class Tooltip:
@@ -52,6 +58,96 @@ class Tooltip:
             self.tip.destroy()
             self.tip = None
 
+# ------------------------ Log view ------------------------
+class LogView:
+    """Batched, size-capped log on top of a ScrolledText.
+
+    ``write()`` only buffers; ``flush()`` inserts everything buffered in one Tk
+    call. Only the newest ``max_lines`` lines stay in the widget (older ones are
+    trimmed from the top), while the full log can be streamed to a file. Hover
+    reasons are kept for visible lines only.
+    """
+
+    def __init__(self, text, max_lines=5000):
+        self.text = text
+        self.max_lines = max_lines
+        self._pending = []
+        self._trimmed = 0  # lines deleted from the top since clear()
+        self._reasons = {}  # absolute line number -> reason, in line order
+        self._file = None
+
+        # Tags are configured once, not per line
+        self.text.tag_config("success", foreground="#16a34a")
+        self.text.tag_config("error", foreground="#ef4444")
+        self.text.tag_config(
+            "summary",
+            foreground="#facc15",
+            background="#374151",
+            font=("Consolas", 10, "bold"),
+            lmargin1=6, lmargin2=6, rmargin=6,
+        )
+
+    def open_file(self, path):
+        self.close_file()
+        try:
+            self._file = open(path, "a", encoding="utf-8")
+        except OSError:
+            self._file = None  # the on-screen log still works
+            return False
+        self._file.write(f"\n===== Run started {time.strftime('%Y-%m-%d %H:%M:%S')} =====\n")
+        return True
+
+    def close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def clear(self):
+        self._pending.clear()
+        self._reasons.clear()
+        self._trimmed = 0
+        self.text.config(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.config(state="disabled")
+
+    def write(self, message, tag=None, reason=None):
+        self._pending.append((message, tag, reason))
+
+    def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+
+        # Absolute number of the first line the batch will occupy
+        line = int(self.text.index("end-1c").split(".")[0]) + self._trimmed
+        chunks = []
+        for message, tag, reason in pending:
+            if reason is not None:
+                self._reasons[line] = reason
+            line += message.count("\n") + 1
+            chunks.extend((message + "\n", tag or ()))
+
+        self.text.config(state="normal")
+        self.text.insert("end", *chunks)
+        excess = int(self.text.index("end-1c").split(".")[0]) - 1 - self.max_lines
+        if excess > 0:
+            self.text.delete("1.0", f"{excess + 1}.0")
+            self._trimmed += excess
+            while self._reasons and next(iter(self._reasons)) <= self._trimmed:
+                del self._reasons[next(iter(self._reasons))]
+        self.text.config(state="disabled")
+        self.text.see("end")
+
+        if self._file is not None:
+            self._file.writelines(
+                f"{message}  ({reason})\n" if reason else message + "\n"
+                for message, _, reason in pending
+            )
+
+    def reason_at(self, x, y):
+        line = int(self.text.index(f"@{x},{y}").split(".")[0])
+        return self._reasons.get(line + self._trimmed, "")
+
 # ------------------------ Intro Page ------------------------
 class IntroductionPage:
     def __init__(self, root, on_continue):
@@ -81,6 +177,12 @@ class IntroductionPage:
 
 # ------------------------ Main App ------------------------
 class ScreenshotSorterApp:
+    POLL_MS = 100  # how often the Tk thread drains worker events
+    MAX_EVENTS_PER_POLL = 5000  # leave the rest for the next tick so the UI stays responsive
+    LOG_MAX_LINES = 5000  # older lines are trimmed from the widget (the log file keeps everything)
+    LOG_FILENAME = "screenshot_sorter.log"
+    PROFILE_FILENAME = "screenshot_sorter.prof"
+
     def __init__(self, root):
         self.root = root
         self.root.title("Screenshot Sorter")
@@ -89,8 +191,17 @@ class ScreenshotSorterApp:
         self.total = 0
         self.done = 0
         self.ok_count = 0
+        self.unchanged_count = 0
         self.skip_count = 0
-        self._error_lines = {}
+        self.duplicate_count = 0
+        self.bytes_saved = 0
+
+        # Worker thread state (engine runs off the Tk thread, talks back via queue)
+        self._events = queue.Queue()
+        self._worker = None
+        self._engine = None
+        self._profile = None
+        self._started = 0.0
 
         self.main_frame = tb.Frame(root, padding=15)
         self.main_frame.pack(fill="both", expand=True)
@@ -138,27 +249,140 @@ class ScreenshotSorterApp:
         self.dest_browse_btn = tb.Button(self.main_frame, text="Browse", command=self.browse_destination, state="disabled", bootstyle=SECONDARY)
         self.dest_browse_btn.grid(row=4, column=2, sticky="ew", padx=(6, 0))
 
-        # Start
-        self.start_btn = tb.Button(self.main_frame, text="Start", command=self.start_sorting, bootstyle=SUCCESS)
-        self.start_btn.grid(row=5, column=0, columnspan=3, pady=(10, 8), sticky="ew")
+        # Run options
+        self.run_opts = tb.Frame(self.main_frame)
+        self.run_opts.grid(row=5, column=0, columnspan=3, sticky="w", pady=(8, 0))
+        checks = tb.Frame(self.run_opts)
+        checks.pack(anchor="w")
+        combos = tb.Frame(self.run_opts)
+        combos.pack(anchor="w", pady=(6, 0))
+        self.incremental_var = tk.BooleanVar(value=True)
+        self.incremental_check = tb.Checkbutton(
+            checks,
+            text="Skip files copied in a previous run (Option 2)",
+            variable=self.incremental_var,
+            bootstyle="round-toggle",
+        )
+        self.incremental_check.pack(side="left")
+        self.recursive_var = tk.BooleanVar(value=False)
+        self.recursive_check = tb.Checkbutton(
+            checks,
+            text="Include subfolders",
+            variable=self.recursive_var,
+            bootstyle="round-toggle",
+        )
+        self.recursive_check.pack(side="left", padx=(16, 0))
+        self.date_fallback_var = tk.BooleanVar(value=False)
+        self.date_fallback_check = tb.Checkbutton(
+            checks,
+            text="Sort other images by date",
+            variable=self.date_fallback_var,
+            bootstyle="round-toggle",
+        )
+        self.date_fallback_check.pack(side="left", padx=(16, 0))
+        Tooltip(self.date_fallback_check, lambda _e: (
+            "Images whose names aren't a known screenshot format go into a date folder,\n"
+            "using the date in the photo's metadata or else the file's date"
+        ))
+        self.catalog_var = tk.BooleanVar(value=False)
+        self.catalog_check = tb.Checkbutton(
+            checks,
+            text="Build gallery index",
+            variable=self.catalog_var,
+            bootstyle="round-toggle",
+        )
+        self.catalog_check.pack(side="left", padx=(16, 0))
+        Tooltip(self.catalog_check, lambda _e: (
+            "Record each sorted screenshot's date, zone, character and size, with a small thumbnail,\n"
+            "so they can be browsed and searched without opening the folders"
+        ))
+        tb.Label(combos, text="Transfer:").pack(side="left", padx=(0, 4))
+        self.transfer_var = tk.StringVar(value="auto")
+        self.transfer_combo = tb.Combobox(
+            combos,
+            textvariable=self.transfer_var,
+            values=list(TRANSFER_POLICIES),
+            state="readonly",
+            width=8,
+        )
+        self.transfer_combo.pack(side="left")
+        Tooltip(self.transfer_combo, lambda _e: (
+            "auto: instant copy-on-write clone where the drive supports it, else a normal copy\n"
+            "link: hardlink on the same drive (Archive and sorted file share the same bytes)\n"
+            "copy: always a full byte copy"
+        ))
+        tb.Label(combos, text="Duplicates:").pack(side="left", padx=(16, 4))
+        self.dedupe_var = tk.StringVar(value="off")
+        self.dedupe_combo = tb.Combobox(
+            combos,
+            textvariable=self.dedupe_var,
+            values=list(DEDUPE_MODES),
+            state="readonly",
+            width=6,
+        )
+        self.dedupe_combo.pack(side="left")
+        Tooltip(self.dedupe_combo, lambda _e: (
+            "Screenshots whose exact content is already sorted or archived:\n"
+            "off: sort them again as (1), (2)… copies\n"
+            "skip: leave them where they are\n"
+            "link: hardlink the existing file into place (no extra space; not with a watermark)"
+        ))
+        tb.Label(combos, text="Parallel writes:").pack(side="left", padx=(16, 4))
+        self.io_jobs_var = tk.StringVar(value="2")
+        self.io_jobs_entry = tb.Entry(combos, textvariable=self.io_jobs_var, width=4)
+        self.io_jobs_entry.pack(side="left")
+        Tooltip(self.io_jobs_entry, lambda _e: (
+            "Files moved/copied at the same time, while the next ones are watermarked.\n"
+            "Raise it for NAS or USB folders; 0 = one file at a time"
+        ))
+        self.profile_var = tk.BooleanVar(value=False)
+        self.profile_check = tb.Checkbutton(
+            combos,
+            text="Profile run",
+            variable=self.profile_var,
+            bootstyle="round-toggle",
+        )
+        self.profile_check.pack(side="left", padx=(16, 0))
+        self.dry_run_var = tk.BooleanVar(value=False)
+        self.dry_run_check = tb.Checkbutton(
+            combos,
+            text="Dry run",
+            variable=self.dry_run_var,
+            bootstyle="round-toggle",
+        )
+        self.dry_run_check.pack(side="left", padx=(16, 0))
+        Tooltip(self.dry_run_check, lambda _e: "Only list where each file would go; nothing is moved or copied")
+
+        # Start / Pause / Cancel
+        self.run_frame = tb.Frame(self.main_frame)
+        self.run_frame.grid(row=6, column=0, columnspan=3, pady=(10, 8), sticky="ew")
+        self.start_btn = tb.Button(self.run_frame, text="Start", command=self.start_sorting, bootstyle=SUCCESS)
+        self.start_btn.pack(side="left", fill="x", expand=True)
+        self.pause_btn = tb.Button(self.run_frame, text="Pause", command=self.toggle_pause, state="disabled", bootstyle=WARNING)
+        self.pause_btn.pack(side="left", padx=(6, 0))
+        self.cancel_btn = tb.Button(self.run_frame, text="Cancel", command=self.cancel_sorting, state="disabled", bootstyle=DANGER)
+        self.cancel_btn.pack(side="left", padx=(6, 0))
 
         # Progress
         self.progress = tb.Progressbar(self.main_frame, mode="determinate", value=0, bootstyle=STRIPED)
-        self.progress.grid(row=6, column=0, columnspan=3, sticky="ew")
+        self.progress.grid(row=7, column=0, columnspan=3, sticky="ew")
         self.status_lbl = tb.Label(self.main_frame, text="Ready.", font=("Segoe UI", 9))
-        self.status_lbl.grid(row=7, column=0, columnspan=3, sticky="w", pady=(4, 8))
+        self.status_lbl.grid(row=8, column=0, columnspan=3, sticky="w", pady=(4, 8))
+        self.rate_lbl = tb.Label(self.main_frame, text="", font=("Segoe UI", 9))
+        self.rate_lbl.grid(row=8, column=0, columnspan=3, sticky="e", pady=(4, 8))
 
         # Log
         self.log_output = scrolledtext.ScrolledText(self.main_frame, height=15, state="disabled", font=("Consolas", 10))
-        self.log_output.grid(row=8, column=0, columnspan=3, sticky="nsew", pady=(6, 0))
+        self.log_output.grid(row=9, column=0, columnspan=3, sticky="nsew", pady=(6, 0))
+        self.log = LogView(self.log_output, max_lines=self.LOG_MAX_LINES)
         Tooltip(self.log_output, self._hover_reason_for_event)
 
         # Theme selector
-        tb.Label(self.main_frame, text="Theme:").grid(row=9, column=0, sticky="w", pady=(10, 0))
+        tb.Label(self.main_frame, text="Theme:").grid(row=10, column=0, sticky="w", pady=(10, 0))
         self.theme_var = tk.StringVar(value=self.root.style.theme_use())
         themes = sorted(self.root.style.theme_names())
         self.theme_combo = tb.Combobox(self.main_frame, textvariable=self.theme_var, values=themes, state="readonly")
-        self.theme_combo.grid(row=9, column=1, sticky="w", pady=(10, 0))
+        self.theme_combo.grid(row=10, column=1, sticky="w", pady=(10, 0))
         self.theme_combo.bind("<<ComboboxSelected>>", self.change_theme)
 
         # --- Watermark (single checkbox + labeled group) ---
@@ -170,10 +394,10 @@ class ScreenshotSorterApp:
             bootstyle="round-toggle",
             command=self._on_toggle_wm,
         )
-        self.wm_check.grid(row=10, column=0, sticky="w", pady=(12, 0))
+        self.wm_check.grid(row=11, column=0, sticky="w", pady=(12, 0))
 
         self.wm_group = tb.Labelframe(self.main_frame, text="Watermark settings", padding=10)
-        self.wm_group.grid(row=11, column=0, columnspan=3, sticky="ew", pady=(6, 0))
+        self.wm_group.grid(row=12, column=0, columnspan=3, sticky="ew", pady=(6, 0))
 
         # Row 0: Select image (left aligned only)
         self.wm_path = tk.StringVar(value="")
@@ -198,9 +422,24 @@ class ScreenshotSorterApp:
         self.opacity_entry = tb.Entry(self.wm_group, textvariable=self.wm_opacity_pct, width=10)
         self.opacity_entry.grid(row=2, column=1, sticky="w", pady=(0, 4))
 
+        # Row 3: Parallel workers (1 = render on the sorting thread)
+        tb.Label(self.wm_group, text="Parallel workers:").grid(row=3, column=0, sticky="w", pady=(0, 4))
+        self.wm_workers = tk.StringVar(value=str(os.cpu_count() or 1))
+        self.workers_entry = tb.Entry(self.wm_group, textvariable=self.wm_workers, width=10)
+        self.workers_entry.grid(row=3, column=1, sticky="w", pady=(0, 4))
+
+        # Row 4: Option 1 single pass (Archive gets the untouched original)
+        self.archive_originals = tk.BooleanVar(value=False)
+        self.archive_orig_check = tb.Checkbutton(
+            self.wm_group,
+            text="Option 1: keep unwatermarked originals in Archive",
+            variable=self.archive_originals,
+        )
+        self.archive_orig_check.grid(row=4, column=0, columnspan=3, sticky="w", pady=(0, 4))
+
         # Layout weights
         self.main_frame.grid_columnconfigure(1, weight=1)
-        self.main_frame.grid_rowconfigure(8, weight=1)
+        self.main_frame.grid_rowconfigure(9, weight=1)
         self.wm_group.grid_columnconfigure(2, weight=1)
 
         # Disable WM controls initially
@@ -209,7 +448,7 @@ class ScreenshotSorterApp:
     # ------------------- Helpers -------------------
     def _set_wm_controls_state(self, enabled: bool):
         state = "normal" if enabled else "disabled"
-        for w in (self.wm_btn, self.pos_combo, self.opacity_entry):
+        for w in (self.wm_btn, self.pos_combo, self.opacity_entry, self.workers_entry, self.archive_orig_check):
             w.config(state=state)
 
     def _on_toggle_wm(self):
@@ -220,7 +459,8 @@ class ScreenshotSorterApp:
                 "Watermark Enabled",
                 "When enabled:\n\n"
                 "✔ Destination screenshots will include the watermark\n"
-                "✔ Archive copies will also include the watermark"
+                "✔ Archive copies will also include the watermark\n"
+                "   (unless \"keep unwatermarked originals\" is ticked)"
             )
 
     def toggle_destination(self):
@@ -261,241 +501,221 @@ class ScreenshotSorterApp:
             messagebox.showerror("Theme Error", f"Could not change theme:\n{e}")
 
     # ------------------- Logging -------------------
-    def _append_text(self, text, tag=None):
-        self.log_output.config(state="normal")
-        start_index = self.log_output.index("end-1c")
-        self.log_output.insert("end", text + "\n")
-        end_index = self.log_output.index("end-1c")
-        if tag:
-            self.log_output.tag_add(tag, start_index, end_index)
-        self.log_output.tag_config("success", foreground="#16a34a")
-        self.log_output.tag_config("error", foreground="#ef4444")
-        self.log_output.tag_config(
-            "summary",
-            foreground="#facc15",
-            background="#374151",
-            font=("Consolas", 10, "bold"),
-            lmargin1=6, lmargin2=6, rmargin=6,
-        )
-        self.log_output.config(state="disabled")
-        self.log_output.see("end")
-        return start_index, end_index
-
-    def log_ok(self, message):
-        self._append_text(message, "success")
-
-    def log_skip(self, message, reason):
-        start, _ = self._append_text(message, "error")
-        self._error_lines[start] = reason
-
     def log_summary(self):
         frame = (
             "==============================\n"
             f"✅ Success: {self.ok_count} files\n"
+            f"⏩ Unchanged: {self.unchanged_count} files\n"
             f"⚠️ Skipped: {self.skip_count} files\n"
-            "=============================="
+            + (f"♻️ Duplicates: {self.duplicate_count} files ({self.bytes_saved / 1e6:.1f} MB saved)\n"
+               if self.duplicate_count else "")
+            + "=============================="
         )
-        self._append_text(frame, "summary")
+        self.log.write(frame, "summary")
+        if self._profile is not None:
+            self.log.write("\n".join(format_profile(self._profile)), "summary")
+        self.log.flush()
 
     def _hover_reason_for_event(self, event):
-        index = self.log_output.index(f"@{event.x},{event.y}")
-        line = index.split(".")[0]
-        start_index = f"{line}.0"
-        return self._error_lines.get(start_index, "")
+        return self.log.reason_at(event.x, event.y)
 
     # ------------------- Sorting -------------------
     def start_sorting(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
         option = self.option_var.get()
         source_folder = self.src_entry.get()
         dest_folder = self.dest_entry.get() if option == "2" else None
 
         # clear log + reset
-        self.log_output.config(state="normal")
-        self.log_output.delete("1.0", "end")
-        self.log_output.config(state="disabled")
-        self.total = self._count_images(source_folder) if source_folder else 0
+        self.log.clear()
+        self.total = 0
         self.done = 0
         self.ok_count = 0
+        self.unchanged_count = 0
         self.skip_count = 0
-        self._error_lines.clear()
-
-        if not source_folder or not os.path.isdir(source_folder):
-            messagebox.showerror("Error", "Please select a valid source folder.")
-            return
-        if option == "2" and (not dest_folder or not os.path.isdir(dest_folder)):
-            messagebox.showerror("Error", "Please select a valid destination folder.")
-            return
-
-        self.progress.config(value=0, maximum=max(self.total, 1))
-        self.status_lbl.config(text=f"Starting… (0 / {self.total})")
-
+        self.duplicate_count = 0
+        self.bytes_saved = 0
+
+        # Snapshot Tk state here: the worker thread must never touch Tk variables
+        watermark = None
+        if self.enable_wm.get() and self.wm_path.get():
+            watermark = WatermarkSettings(
+                path=self.wm_path.get(),
+                position=self.wm_position.get(),
+                opacity=self._get_opacity_float(),
+            )
+        # Log file (and cProfile dump) go next to the sorted output
+        log_dir = dest_folder if option == "2" else source_folder
+        profile = self.profile_var.get()
+        dry_run = self.dry_run_var.get()
+        settings = SortSettings(
+            source=source_folder,
+            mode="archive" if option == "1" else "copy",
+            dest=dest_folder,
+            watermark=watermark,
+            jobs=self._get_workers_int(),
+            io_jobs=self._get_io_jobs_int(),
+            incremental=self.incremental_var.get(),
+            archive_originals=self.archive_originals.get(),
+            recursive=self.recursive_var.get(),
+            transfer=self.transfer_var.get(),
+            dedupe=self.dedupe_var.get(),
+            date_fallback=self.date_fallback_var.get(),
+            catalog=self.catalog_var.get(),
+            profile=profile,
+            # Dry runs only report timings: the cProfile dump would be a file in the folder
+            profile_dump=os.path.join(log_dir, self.PROFILE_FILENAME) if profile and not dry_run else None,
+            dry_run=dry_run,
+        )
+        self._events = queue.Queue()
+        self._engine = SortEngine(settings, emit=self._events.put)
+        if not dry_run and self._engine.interrupted_run():
+            answer = messagebox.askyesnocancel(
+                "Interrupted run",
+                "The previous run in this folder did not finish.\n\n"
+                "Yes: resume it where it stopped (with its original settings)\n"
+                "No: discard it and start over",
+            )
+            if answer is None:
+                return
+            settings.resume, settings.restart = answer, not answer
         try:
-            if option == "1":
-                self.sort_and_archive_in_source(source_folder)
-            else:
-                self.copy_to_destination(dest_folder, source_folder)
-
-            self.log_summary()
-            messagebox.showinfo("Done", "Sorting completed.")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred:\n{e}")
-
-    def _count_images(self, folder):
-        if not folder or not os.path.isdir(folder):
-            return 0
-        return sum(1 for f in os.listdir(folder) if f.lower().endswith((".png", ".jpg", ".jpeg")))
-
-    def _step_progress(self):
-        self.done += 1
-        self.progress.config(value=self.done)
-        self.status_lbl.config(text=f"Processing… ({self.done} / {self.total})")
-        self.root.update_idletasks()
-
-    def extract_info(self, filename):
-        pattern = r"^(\d{4}-\d{2}-\d{2})_\d{2}-\d{2}-\d{2}\.\d{3}-(.+)-([^-]+)\.(?:png|jpg|jpeg)$"
-        match = re.match(pattern, filename, re.IGNORECASE)
-        if match:
-            date_str = match.group(1).strip()
-            location = match.group(2).strip()
-            character = match.group(3).strip()
-            date_folder_name = "-".join(date_str.split("-")[::-1])
-            return date_folder_name, location, character
-        return None, None, None
-
-    # ------ filename versioning ------
-    def _next_available_path(self, path):
-        if not os.path.exists(path):
-            return path
-        base, ext = os.path.splitext(path)
-        i = 1
-        while True:
-            candidate = f"{base} ({i}){ext}"
-            if not os.path.exists(candidate):
-                return candidate
-            i += 1
-
-    # ------ Move & Archive ------
-    def sort_and_archive_in_source(self, source_folder):
-        archive_folder = os.path.join(source_folder, "Archive")
-        os.makedirs(archive_folder, exist_ok=True)
-
-        for file in os.listdir(source_folder):
-            if not file.lower().endswith((".png", ".jpg", ".jpeg")):
-                continue
-            full_src_path = os.path.join(source_folder, file)
-            if os.path.isdir(full_src_path):
-                continue
-
-            date_folder, location, character = self.extract_info(file)
-            if not date_folder or not location or not character:
-                self.skip_count += 1
-                self.log_skip(f"[SKIPPED] {file} – Unrecognized format", "Filename does not match FFXIV pattern.")
-                self._step_progress()
-                continue
-
-            dest_dir = os.path.join(source_folder, date_folder, location, character)
-            os.makedirs(dest_dir, exist_ok=True)
-
-            dest_path = self._next_available_path(os.path.join(dest_dir, file))
-            shutil.move(full_src_path, dest_path)  # move original
+            self._engine.validate()
+        except SortError as e:
+            messagebox.showerror("Error", str(e))
+            return
 
-            # Watermark (if enabled), then archive the resulting file
-            if self.enable_wm.get() and self.wm_path.get():
-                self.apply_watermark(dest_path)
+        # The widget only keeps the newest lines; the whole run goes to a log file
+        # (except for dry runs, which must leave the folders untouched)
+        if not dry_run:
+            self.log.open_file(os.path.join(log_dir, self.LOG_FILENAME))
+        self._profile = None
+        self._started = time.monotonic()
+        self.rate_lbl.config(text="")
 
-            archive_target = self._next_available_path(os.path.join(archive_folder, os.path.basename(dest_path)))
-            shutil.copy2(dest_path, archive_target)
+        self.progress.config(value=0, maximum=1)
+        self.status_lbl.config(text="Scanning…")
+        self._set_running(True)
 
-            self.ok_count += 1
-            self.log_ok(f"[MOVED] {os.path.basename(dest_path)} → {date_folder}/{location}/{character}")
-            self._step_progress()
+        self._worker = threading.Thread(target=self._run_job, daemon=True)
+        self._worker.start()
+        self.root.after(self.POLL_MS, self._poll_events)
 
-    # ------ Copy to destination ------
-    def copy_to_destination(self, dest_folder, source_folder):
-        for file in os.listdir(source_folder):
-            if not file.lower().endswith((".png", ".jpg", ".jpeg")):
+    def _run_job(self):
+        """Worker thread body. Only communicates with the GUI through ``self._events``."""
+        try:
+            self._engine.run()
+        except Exception as e:
+            self._events.put({"event": "failed", "error": str(e)})
+
+    def _poll_events(self):
+        """Drain worker events and apply them to the widgets in one batch."""
+        finished = None
+        for _ in range(self.MAX_EVENTS_PER_POLL):
+            try:
+                event = self._events.get_nowait()
+            except queue.Empty:
+                break
+            kind = event["event"]
+            if kind == "start":
+                self.total = event["total"]
+            elif kind in ("file", "planned"):
+                self.done = event["done"]
+            elif kind == "summary":
+                self.ok_count = event["ok"]
+                self.unchanged_count = event["unchanged"]
+                self.skip_count = event["skipped"]
+                self.duplicate_count = event["duplicates"]
+                self.bytes_saved = event["bytes_saved"]
+                finished = event
                 continue
-            full_src_path = os.path.join(source_folder, file)
-            if os.path.isdir(full_src_path):
+            elif kind == "failed":
+                finished = event
                 continue
-
-            date_folder, location, character = self.extract_info(file)
-            if not date_folder or not location or not character:
-                self.skip_count += 1
-                self.log_skip(f"[SKIPPED] {file} – Unrecognized format", "Filename does not match FFXIV pattern.")
-                self._step_progress()
+            elif kind == "profile":
+                self._profile = event
                 continue
+            formatted = format_event(event)
+            if formatted is not None:
+                self.log.write(*formatted)
+        self.log.flush()
+
+        self.progress.config(value=self.done, maximum=max(self.total, 1))
+        if finished is None:
+            verb = "Paused" if self._engine.paused else "Processing"
+            self.status_lbl.config(text=f"{verb}… ({self.done} / {self.total})")
+            self._update_rate()
+            self.root.after(self.POLL_MS, self._poll_events)
+            return
 
-            dest_dir = os.path.join(dest_folder, date_folder, location, character)
-            os.makedirs(dest_dir, exist_ok=True)
-
-            dest_file_path = self._next_available_path(os.path.join(dest_dir, file))
-            shutil.copy2(full_src_path, dest_file_path)
+        self._set_running(False)
+        if finished["event"] == "failed":
+            self.log.close_file()
+            self.status_lbl.config(text="Failed.")
+            messagebox.showerror("Error", f"An error occurred:\n{finished['error']}")
+            return
+        self.log_summary()
+        self.log.close_file()
+        if finished["status"] == "cancelled":
+            self.status_lbl.config(text=f"Cancelled. ({self.done} / {self.total})")
+            messagebox.showinfo("Cancelled", "Sorting was cancelled.")
+        elif finished["status"] == "planned":
+            self.status_lbl.config(text=f"Dry run done. ({self.done} / {self.total})")
+            messagebox.showinfo("Dry run", "Dry run completed; no files were changed.")
+        else:
+            self.status_lbl.config(text=f"Done. ({self.done} / {self.total})")
+            messagebox.showinfo("Done", "Sorting completed.")
 
-            if self.enable_wm.get() and self.wm_path.get():
-                self.apply_watermark(dest_file_path)
+    def _update_rate(self):
+        """Live throughput and ETA next to the status line."""
+        elapsed = time.monotonic() - self._started
+        if not self.done or elapsed <= 0:
+            return
+        rate = self.done / elapsed
+        remaining = max(self.total - self.done, 0) / rate
+        mins, secs = divmod(int(remaining), 60)
+        self.rate_lbl.config(text=f"{rate:.1f} files/s · ETA {mins}:{secs:02d}")
+
+    def _set_running(self, running):
+        self.start_btn.config(state="disabled" if running else "normal")
+        self.pause_btn.config(state="normal" if running else "disabled", text="Pause")
+        self.cancel_btn.config(state="normal" if running else "disabled")
+
+    def toggle_pause(self):
+        if not self._engine.paused:
+            self._engine.pause()
+            self.pause_btn.config(text="Resume")
+        else:
+            self._engine.resume()
+            self.pause_btn.config(text="Pause")
 
-            self.ok_count += 1
-            self.log_ok(f"[COPIED] {os.path.basename(dest_file_path)} → {date_folder}/{location}/{character}")
-            self._step_progress()
+    def cancel_sorting(self):
+        self._engine.cancel()
+        self.cancel_btn.config(state="disabled")
+        self.pause_btn.config(state="disabled")
+        self.status_lbl.config(text="Cancelling…")
 
     # ------ Watermark ------
     def _get_opacity_float(self):
         """Read opacity from the % entry and clamp to [0.05, 1.0]."""
+        return opacity_from_percent(self.wm_opacity_pct.get())
+
+    def _get_workers_int(self):
+        """Read the parallel worker count; blank/invalid means one per CPU."""
         try:
-            pct = float(self.wm_opacity_pct.get().strip())
+            workers = int(self.wm_workers.get().strip())
         except Exception:
-            pct = 70.0
-        pct = max(5.0, min(100.0, pct))  # clamp 5–100%
-        return pct / 100.0
+            workers = os.cpu_count() or 1
+        return max(1, workers)
 
-    def apply_watermark(self, filepath):
+    def _get_io_jobs_int(self):
+        """Read the parallel write count; blank/invalid means the default of 2."""
         try:
-            base = Image.open(filepath).convert("RGBA")
-            wm = Image.open(self.wm_path.get()).convert("RGBA")
-
-            # Trim transparent padding so it truly hugs the corner
-            bbox = wm.getbbox()
-            if bbox:
-                wm = wm.crop(bbox)
-
-            # Resize watermark to ~30% of base width (visible but not huge)
-            scale = max(1, base.width // 3)
-            ratio = wm.height / wm.width if wm.width else 1
-            wm = wm.resize((scale, max(1, int(scale * ratio))), Image.LANCZOS)
-
-            # Opacity
-            opacity = self._get_opacity_float()
-            alpha = wm.split()[3]
-            alpha = alpha.point(lambda p: int(p * opacity))
-            wm.putalpha(alpha)
-
-            # Position
-            margin = 10
-            pos = self.wm_position.get()
-            if pos == "top-left":
-                xy = (margin, margin)
-            elif pos == "top-right":
-                xy = (base.width - wm.width - margin, margin)
-            elif pos == "bottom-left":
-                xy = (margin, base.height - wm.height - margin)
-            else:  # bottom-right
-                xy = (base.width - wm.width - margin, base.height - wm.height - margin)
-
-            base.paste(wm, xy, wm)
-
-            # Save preserving original format
-            ext = os.path.splitext(filepath)[1].lower()
-            if ext in (".jpg", ".jpeg"):
-                base = base.convert("RGB")
-                base.save(filepath, quality=95)
-            else:
-                base.save(filepath)
-
-            self.log_ok(f"[WATERMARK] applied to {os.path.basename(filepath)}")
-
-        except Exception as e:
-            self.log_skip(f"[WATERMARK FAILED] {os.path.basename(filepath)}", str(e))
+            io_jobs = int(self.io_jobs_var.get().strip())
+        except Exception:
+            io_jobs = 2
+        return max(0, io_jobs)
 
 # ------------------------ entrypoint ------------------------
 def main():
@@ -511,4 +731,5 @@ def main():
     root.mainloop()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # needed for the watermark pool in a frozen .exe
     main()
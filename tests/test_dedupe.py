@@ -0,0 +1,74 @@
+"""``--dedupe link`` in Option 1: which duplicates are linked and which are removed.
+
+Run with ``python -m unittest discover tests`` (or pytest).
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from screenshot_sorter.dedupe import ContentIndex
+from screenshot_sorter.engine import SortEngine, SortSettings
+from screenshot_sorter.scan import ARCHIVE_DIRNAME
+
+NAME = "2025-05-25_00-35-19.549-New Gridania-Char Name.png"
+REDATED = "2025-05-26_10-00-00.000-New Gridania-Char Name.png"
+SORTED = os.path.join("25-05-2025", "New Gridania", "Char Name")
+
+
+class DedupeLinkTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.write(NAME, b"shot" * 1000)
+        self.sort(dedupe="off")
+
+    def path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def write(self, name, data):
+        with open(self.path(name), "wb") as f:
+            f.write(data)
+
+    def sort(self, dedupe="link"):
+        return SortEngine(SortSettings(self.root, dedupe=dedupe)).run()
+
+    def test_reimported_original_is_removed(self):
+        shutil.copy2(self.path(ARCHIVE_DIRNAME, NAME), self.path(NAME))
+        self.sort()
+        self.assertFalse(os.path.exists(self.path(NAME)))
+        self.assertEqual(os.listdir(self.path(SORTED)), [NAME])
+        self.assertEqual(os.listdir(self.path(ARCHIVE_DIRNAME)), [NAME])
+
+    def test_redated_copy_is_linked_into_its_own_folder(self):
+        shutil.copy2(self.path(SORTED, NAME), self.path(REDATED))
+        self.sort()
+        self.assertFalse(os.path.exists(self.path(REDATED)))
+        linked = self.path("26-05-2025", "New Gridania", "Char Name", REDATED)
+        self.assertTrue(os.path.samefile(linked, self.path(SORTED, NAME)))
+        self.assertTrue(os.path.exists(self.path(ARCHIVE_DIRNAME, REDATED)))
+
+    def test_copy_only_left_in_archive_is_linked(self):
+        shutil.rmtree(self.path("25-05-2025"))
+        shutil.copy2(self.path(ARCHIVE_DIRNAME, NAME), self.path(REDATED))
+        self.sort()
+        linked = self.path("26-05-2025", "New Gridania", "Char Name", REDATED)
+        self.assertTrue(os.path.samefile(linked, self.path(ARCHIVE_DIRNAME, NAME)))
+
+
+class ContentIndexTest(unittest.TestCase):
+    def test_preferred_match_wins(self):
+        index = ContentIndex(hasher=lambda path: "same")
+        with tempfile.TemporaryDirectory() as folder:
+            first, second = os.path.join(folder, "a.png"), os.path.join(folder, "b.png")
+            for path in (first, second):
+                open(path, "wb").close()
+            index.add(first, 10)
+            index.add(second, 10)
+            self.assertEqual(index.match("new.png", 10)[0], first)
+            self.assertEqual(index.match("new.png", 10, prefer=lambda path: path == second)[0], second)
+            self.assertEqual(index.match("new.png", 10, prefer=lambda path: False)[0], first)
+
+
+if __name__ == "__main__":
+    unittest.main()